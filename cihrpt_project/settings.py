@@ -45,7 +45,7 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
-    'django.middleware.cache.UpdateCacheMiddleware',  # Must be first
+    'tracker.cache_utils.VersionedUpdateCacheMiddleware',  # Must be first
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
@@ -53,13 +53,13 @@ MIDDLEWARE = [
     'django.contrib.auth.middleware.AuthenticationMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
-    'django.middleware.cache.FetchFromCacheMiddleware',  # Must be last
+    'tracker.cache_utils.VersionedFetchFromCacheMiddleware',  # Must be last
 ]
 
 # Cache middleware settings
 CACHE_MIDDLEWARE_ALIAS = 'default'
 CACHE_MIDDLEWARE_SECONDS = config('CACHE_MIDDLEWARE_SECONDS', default=600, cast=int) if HAS_DECOUPLE else 300
-CACHE_MIDDLEWARE_KEY_PREFIX = 'cihrpt'
+CACHE_MIDDLEWARE_KEY_PREFIX = 'cihrpt'  # The data version is appended, so imports retire cached pages
 
 ROOT_URLCONF = 'cihrpt_project.urls'
 
@@ -205,14 +205,24 @@ DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 if HAS_DECOUPLE:
     CIHRPT_DATA_DIR = Path(config('CIHRPT_DATA_DIR', default=str(BASE_DIR / 'cihr_projects_jsons')))
     CIHRPT_CSV_FILE = Path(config('CIHRPT_CSV_FILE', default=str(BASE_DIR / 'cihr_projects.csv')))
+    # Entries in each process's in-memory tier in front of Redis
+    CIHRPT_LOCAL_CACHE_SIZE = config('CIHRPT_LOCAL_CACHE_SIZE', default=256, cast=int)
+    # Pre-built full exports, shared by every web process
+    CIHRPT_EXPORT_DIR = Path(config('CIHRPT_EXPORT_DIR', default=str(BASE_DIR / 'exports')))
 else:
     CIHRPT_DATA_DIR = BASE_DIR / 'cihr_projects_jsons'
     CIHRPT_CSV_FILE = BASE_DIR / 'cihr_projects.csv'
+    CIHRPT_LOCAL_CACHE_SIZE = 256
+    CIHRPT_EXPORT_DIR = BASE_DIR / 'exports'
 
 # REST Framework configuration
 REST_FRAMEWORK = {
     'DEFAULT_PAGINATION_CLASS': 'rest_framework.pagination.PageNumberPagination',
     'PAGE_SIZE': 50,
+    'DEFAULT_RENDERER_CLASSES': [
+        'tracker.renderers.FastJSONRenderer',
+        'rest_framework.renderers.BrowsableAPIRenderer',
+    ],
     'DEFAULT_FILTER_BACKENDS': [
         'django_filters.rest_framework.DjangoFilterBackend',
         'rest_framework.filters.SearchFilter',
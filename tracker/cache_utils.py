@@ -0,0 +1,272 @@
+"""Versioned cache namespace, a per-process tier and stampede-protected cached values"""
+import hashlib
+import math
+import random
+import threading
+import time
+import uuid
+from collections import OrderedDict
+
+from django.conf import settings
+from django.core.cache import cache
+from django.middleware.cache import CacheMiddleware, FetchFromCacheMiddleware, UpdateCacheMiddleware
+from django.utils.decorators import decorator_from_middleware_with_args
+
+
+# Shared cache key holding the current data version
+DATA_VERSION_KEY = 'cihrpt_data_version'
+
+# Versioned keys stay valid until the next import; the timeout only reclaims
+# keys left behind by retired versions
+VERSIONED_CACHE_TIMEOUT = 60 * 60 * 24 * 7
+
+
+# Entries held by each process's in-memory tier
+LOCAL_CACHE_SIZE = getattr(settings, 'CIHRPT_LOCAL_CACHE_SIZE', 256)
+
+# Seconds a process trusts its copy of the data version before re-reading it
+VERSION_CHECK_INTERVAL = 5
+
+
+class LocalCache:
+    """Bounded per-process LRU in front of the shared cache for versioned keys.
+
+    Hits skip the network round trip and unpickling. Values are shared by
+    every request in the process and must be treated as read-only. The
+    whole tier is dropped when the data version changes.
+    """
+
+    def __init__(self, max_entries):
+        self.max_entries = max_entries
+        self.lock = threading.Lock()
+        self.entries = OrderedDict()
+        self.version = None
+        self.version_checked = 0
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key, now, count=True):
+        """(value, expires_at, cost) entry for key, or None if absent or expired.
+
+        count=False leaves the hit/miss counters alone (used while polling).
+        """
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is None or now >= entry[1]:
+                if count:
+                    self.misses += 1
+                return None
+            self.entries.move_to_end(key)
+            if count:
+                self.hits += 1
+            return entry
+
+    def set(self, key, entry):
+        with self.lock:
+            self.entries[key] = entry
+            self.entries.move_to_end(key)
+            while len(self.entries) > self.max_entries:
+                self.entries.popitem(last=False)
+
+    def sync_version(self, version):
+        with self.lock:
+            if version != self.version:
+                self.entries.clear()
+                self.version = version
+            self.version_checked = time.monotonic()
+
+    def stats(self):
+        with self.lock:
+            lookups = self.hits + self.misses
+            return {
+                'hits': self.hits,
+                'misses': self.misses,
+                'hit_ratio': self.hits / lookups if lookups else 0.0,
+                'size': len(self.entries),
+                'max_entries': self.max_entries,
+            }
+
+
+local_cache = LocalCache(LOCAL_CACHE_SIZE)
+
+
+def data_version():
+    """Current data version, created on first use and re-read every VERSION_CHECK_INTERVAL"""
+    checked_ago = time.monotonic() - local_cache.version_checked
+    if local_cache.version is None or checked_ago > VERSION_CHECK_INTERVAL:
+        local_cache.sync_version(cache.get_or_set(DATA_VERSION_KEY, lambda: uuid.uuid4().hex, None))
+    return local_cache.version
+
+
+def bump_data_version():
+    """Retire every versioned key at once (called after imports commit)"""
+    version = uuid.uuid4().hex
+    cache.set(DATA_VERSION_KEY, version, None)
+    local_cache.sync_version(version)
+
+
+def local_cache_stats():
+    """Hit/miss counters and size of this process's in-memory tier"""
+    return local_cache.stats()
+
+
+def versioned_key(name, *parts):
+    """Cache key for name under the current data version"""
+    return ':'.join([name, data_version(), *map(str, parts)])
+
+
+class VersionedKeyPrefixMixin:
+    """Cache middleware whose key prefix includes the data version, so imports retire cached pages"""
+
+    @property
+    def key_prefix(self):
+        return f'{self.base_key_prefix}.{data_version()}'
+
+    @key_prefix.setter
+    def key_prefix(self, value):
+        self.base_key_prefix = value
+
+
+class VersionedUpdateCacheMiddleware(VersionedKeyPrefixMixin, UpdateCacheMiddleware):
+    pass
+
+
+class VersionedFetchFromCacheMiddleware(VersionedKeyPrefixMixin, FetchFromCacheMiddleware):
+    pass
+
+
+class VersionedCacheMiddleware(VersionedKeyPrefixMixin, CacheMiddleware):
+    pass
+
+
+def versioned_cache_page(timeout, *, cache=None, key_prefix=None):
+    """cache_page whose entries are retired by the next import as well as by timeout"""
+    return decorator_from_middleware_with_args(VersionedCacheMiddleware)(
+        page_timeout=timeout, cache_alias=cache, key_prefix=key_prefix
+    )
+
+
+# Seconds past its timeout that a value may still be served while one process recomputes it
+STALE_GRACE = 60 * 5
+
+# Lifetime of the lock held by the process recomputing a key
+RECOMPUTE_LOCK_TIMEOUT = 60
+
+# How long a cold miss waits for another process's result before computing it too
+LOCK_WAIT = 10
+LOCK_POLL_INTERVAL = 0.05
+
+# Higher values refresh earlier ahead of expiry (1.0 is the usual XFetch setting)
+EARLY_REFRESH_BETA = 1.0
+
+
+def _acquire(key):
+    token = uuid.uuid4().hex
+    # add() is atomic (SET NX on Redis), so only one process gets the lock
+    return token if cache.add(f'{key}:lock', token, RECOMPUTE_LOCK_TIMEOUT) else None
+
+
+def _release(key, token):
+    if cache.get(f'{key}:lock') == token:
+        cache.delete(f'{key}:lock')
+
+
+def _store(key, compute, timeout):
+    start = time.perf_counter()
+    value = compute()
+    cost = time.perf_counter() - start
+    if timeout is None:
+        entry = (value, math.inf, cost)
+        cache.set(key, entry, None)
+    else:
+        entry = (value, time.time() + timeout, cost)
+        cache.set(key, entry, timeout + STALE_GRACE)
+    local_cache.set(key, entry)
+    return value
+
+
+def _lookup(key, count=True):
+    """Entry from this process's tier, falling back to the shared cache"""
+    entry = local_cache.get(key, time.time(), count)
+    if entry is None:
+        entry = cache.get(key)
+        if entry is not None:
+            local_cache.set(key, entry)
+    return entry
+
+
+def get_or_compute(key, compute, timeout=VERSIONED_CACHE_TIMEOUT, beta=EARLY_REFRESH_BETA):
+    """Cached compute() with stale-while-revalidate and single-flight recomputation.
+
+    key must be a versioned_key(). Fresh entries are served from the
+    process's LocalCache before the shared cache is asked. Entries remember
+    how long they took to compute. Shortly before expiry a request may be
+    picked to refresh early, with a probability that grows as expiry nears
+    and with the cost (XFetch). Expired entries are kept for
+    STALE_GRACE and served while the one process holding the lock recomputes
+    them. On a cold miss the other processes wait up to LOCK_WAIT for that
+    result instead of all running compute() at once.
+    """
+    entry = _lookup(key)
+    if entry is not None:
+        value, expires_at, cost = entry
+        if time.time() - cost * beta * math.log(1.0 - random.random()) < expires_at:
+            return value
+        token = _acquire(key)
+        if token is None:
+            return value
+        try:
+            return _store(key, compute, timeout)
+        finally:
+            _release(key, token)
+
+    deadline = time.monotonic() + LOCK_WAIT
+    token = _acquire(key)
+    while token is None and time.monotonic() < deadline:
+        time.sleep(LOCK_POLL_INTERVAL)
+        # The initial lookup already counted this call as a miss
+        entry = _lookup(key, count=False)
+        if entry is not None:
+            return entry[0]
+        token = _acquire(key)
+    try:
+        return _store(key, compute, timeout)
+    finally:
+        if token is not None:
+            _release(key, token)
+
+
+def normalize_query(query):
+    """Search query with whitespace collapsed, as the ranking pages filter with it.
+
+    Case is kept: icontains folds case differently per database (ASCII only
+    on SQLite), so queries differing in case may match different rows.
+    """
+    return ' '.join((query or '').split())
+
+
+def query_digest(query):
+    """Stable digest of the normalized query (unlike hash(), the same in every process)"""
+    return hashlib.sha256(normalize_query(query).encode('utf-8')).hexdigest()
+
+
+class BoundedResultCache:
+    """Per-process LRU of computed results under versioned keys.
+
+    For results whose keys are unbounded (e.g. one per search query): the
+    number kept is capped at max_entries, and keys of retired data versions
+    simply age out.
+    """
+
+    def __init__(self, max_entries):
+        self.results = LocalCache(max_entries)
+
+    def get_or_compute(self, key, compute):
+        entry = self.results.get(key, time.time())
+        if entry is None:
+            entry = (compute(), math.inf, 0)
+            self.results.set(key, entry)
+        return entry[0]
+
+    def stats(self):
+        return self.results.stats()
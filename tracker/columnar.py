@@ -0,0 +1,147 @@
+"""In-process columnar snapshot of the project table for vectorized aggregates"""
+import threading
+
+import numpy as np
+
+from .cache_utils import data_version
+from .models import FLAG_FIELDS, CIHRProject
+
+
+# Columns stored as integer codes into a per-column list of distinct values
+CATEGORY_FIELDS = [
+    'broad_study_type', 'therapeutic_area', 'primary_institute', 'primary_theme',
+    'research_institution', 'competition_year',
+]
+
+
+def is_blank(value):
+    """True for the placeholder values excluded from rankings (missing, empty, 'N/A')"""
+    return value is None or (isinstance(value, str) and value.strip().lower() in ('', 'n/a'))
+
+
+class ColumnarSnapshot:
+    """The project table as NumPy columns.
+
+    funding holds the parsed funding amounts (NaN when unknown), each
+    CATEGORY_FIELDS column is an int32 array of codes into categories[field],
+    and flags is a bool matrix with one column per FLAG_FIELDS entry. Group-by
+    counts and sums are np.bincount over the codes, and crosstabs a bincount
+    over combined codes, so no aggregate touches the database.
+    """
+
+    def __init__(self, rows):
+        rows = list(rows)
+        self.size = len(rows)
+        self.project_ids = np.array([row[0] for row in rows], dtype=object)
+
+        self.funding = np.array([np.nan if row[1] is None else row[1] for row in rows], dtype=np.float64)
+        self.funded = self.funding > 0
+        self.funding_filled = np.where(self.funded, self.funding, 0.0)
+
+        self.codes = {}
+        self.categories = {}
+        self.blank = {}
+        for position, field in enumerate(CATEGORY_FIELDS, start=2):
+            lookup = {}
+            codes = np.fromiter(
+                (lookup.setdefault(row[position], len(lookup)) for row in rows), dtype=np.int32, count=self.size
+            )
+            self.codes[field] = codes
+            self.categories[field] = list(lookup)
+            self.blank[field] = np.array([is_blank(value) for value in lookup], dtype=bool)
+
+        bitmasks = np.array([row[-1] or 0 for row in rows], dtype=np.int64)
+        bits = np.arange(len(FLAG_FIELDS), dtype=np.int64)
+        self.flags = ((bitmasks[:, None] >> bits) & 1).astype(bool)
+        self.flag_index = {name: bit for bit, name in enumerate(FLAG_FIELDS)}
+
+    @classmethod
+    def from_database(cls):
+        rows = CIHRProject.objects.order_by().values_list(
+            'project_id', 'funding_amount', *CATEGORY_FIELDS, 'flags'
+        )
+        return cls(rows.iterator(chunk_size=2000))
+
+    def flag(self, name):
+        """Bool column of projects answering 'yes' to a flag"""
+        return self.flags[:, self.flag_index[name]]
+
+    def _selection(self, mask, fields, skip_blank):
+        keep = np.ones(self.size, dtype=bool) if mask is None else mask.copy()
+        if skip_blank:
+            for field in fields:
+                keep &= ~self.blank[field][self.codes[field]]
+        return keep
+
+    def group(self, field, weights=None, mask=None, skip_blank=True):
+        """{value: count} per category of field, or {value: sum of weights}"""
+        keep = self._selection(mask, [field], skip_blank)
+        codes = self.codes[field][keep]
+        size = len(self.categories[field])
+        counts = np.bincount(codes, minlength=size)
+        totals = counts if weights is None else np.bincount(codes, weights=weights[keep], minlength=size)
+        return {
+            value: total.item()
+            for value, count, total in zip(self.categories[field], counts, totals)
+            if count
+        }
+
+    def top(self, field, limit=None, weights=None, mask=None, skip_blank=True):
+        """(value, total) pairs of group(), largest first"""
+        totals = self.group(field, weights=weights, mask=mask, skip_blank=skip_blank)
+        ranked = sorted(totals.items(), key=lambda item: (-item[1], str(item[0])))
+        return ranked[:limit] if limit else ranked
+
+    def crosstab(self, rows, columns, weights=None, mask=None, skip_blank=True):
+        """(row values, column values, matrix) of counts or weight sums per pair of categories"""
+        keep = self._selection(mask, [rows, columns], skip_blank)
+        row_codes = self.codes[rows][keep]
+        column_codes = self.codes[columns][keep]
+        shape = (len(self.categories[rows]), len(self.categories[columns]))
+        combined = row_codes.astype(np.int64) * shape[1] + column_codes
+        counts = np.bincount(combined, minlength=shape[0] * shape[1]).reshape(shape)
+        matrix = counts if weights is None else np.bincount(
+            combined, weights=weights[keep], minlength=shape[0] * shape[1]
+        ).reshape(shape)
+
+        row_positions = np.flatnonzero(counts.any(axis=1))
+        column_positions = np.flatnonzero(counts.any(axis=0))
+        return (
+            [self.categories[rows][position] for position in row_positions],
+            [self.categories[columns][position] for position in column_positions],
+            matrix[np.ix_(row_positions, column_positions)],
+        )
+
+    def flag_totals(self, names, weights=None, mask=None):
+        """{flag: number of 'yes' projects}, or the sum of weights over them"""
+        selected = self.flags[:, [self.flag_index[name] for name in names]]
+        if mask is not None:
+            selected = selected & mask[:, None]
+        totals = selected.sum(axis=0) if weights is None else weights @ selected
+        return {name: total.item() for name, total in zip(names, totals)}
+
+
+class ColumnarEngine:
+    """Per-process ColumnarSnapshot, rebuilt once per data version"""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.snapshot = None
+        self.version = None
+
+    def current(self):
+        version = data_version()
+        if self.snapshot is None or version != self.version:
+            with self.lock:
+                if self.snapshot is None or version != self.version:
+                    self.snapshot = ColumnarSnapshot.from_database()
+                    self.version = version
+        return self.snapshot
+
+
+engine = ColumnarEngine()
+
+
+def columns():
+    """ColumnarSnapshot of the project table for the current data version"""
+    return engine.current()
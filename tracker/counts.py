@@ -0,0 +1,62 @@
+"""Cached exact counts and planner estimates for filtered project lists"""
+import hashlib
+import json
+from collections import namedtuple
+
+from django.db import DatabaseError, connections
+
+from .cache_utils import get_or_compute, versioned_key
+
+
+# Free-text searches estimated at more rows than this are not counted exactly
+ESTIMATE_THRESHOLD = 1000
+
+# project_list filters that match case-insensitively, so 'Cancer' and 'cancer' share a count
+CASE_INSENSITIVE_FILTERS = {'search', 'therapeutic_area'}
+
+ResultCount = namedtuple('ResultCount', ['value', 'approximate'])
+
+
+def count_cache_key(filters, prefix='project_count'):
+    """Cache key for a filter combination, independent of parameter order and empty values"""
+    normalized = {
+        name: value.lower() if name in CASE_INSENSITIVE_FILTERS else value
+        for name, value in filters.items()
+        if value
+    }
+    digest = hashlib.sha256(json.dumps(normalized, sort_keys=True).encode('utf-8')).hexdigest()
+    return versioned_key(prefix, digest)
+
+
+def planner_estimate(queryset):
+    """Row estimate from PostgreSQL's EXPLAIN, or None where unavailable"""
+    if connections[queryset.db].vendor != 'postgresql':
+        return None
+    try:
+        plan = json.loads(queryset.order_by().explain(format='json'))
+    except (DatabaseError, ValueError):
+        return None
+    if isinstance(plan, list):
+        plan = plan[0]
+    try:
+        return int(plan['Plan']['Plan Rows'])
+    except (KeyError, TypeError, ValueError):
+        return None
+
+
+def count_projects(queryset, filters, free_text=False):
+    """Result count for a filtered project queryset.
+
+    Counts are cached per normalized filter combination under the current
+    data version, and computed by one process at a time. Free-text searches
+    that the planner expects to match many rows get its estimate instead,
+    flagged as approximate (and cached the same way).
+    """
+    def compute():
+        if free_text:
+            estimate = planner_estimate(queryset)
+            if estimate is not None and estimate > ESTIMATE_THRESHOLD:
+                return ResultCount(estimate, True)
+        return ResultCount(queryset.count(), False)
+
+    return ResultCount(*get_or_compute(count_cache_key(filters), compute))
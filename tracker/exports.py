@@ -0,0 +1,223 @@
+"""Streaming bulk exports of the project table as CSV, JSON Lines or Parquet"""
+import csv
+import io
+import os
+import tempfile
+
+from django.conf import settings
+from django.core.exceptions import ValidationError
+from django.core.serializers.json import DjangoJSONEncoder
+
+from .cache_utils import data_version
+from .facets import FACET_FIELDS
+from .models import FLAG_FIELDS, FLAG_MASKS, FLAG_STORAGE_FIELDS, CIHRProject, flag_q
+from .search import search_projects
+from .utils import chunked
+
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+except ImportError:
+    pa = pq = None
+
+
+# Columns exported, in order: the model columns the API exposes, then each flag as 'yes'/'no'
+COLUMN_FIELDS = [
+    field.name for field in CIHRProject._meta.concrete_fields
+    if field.name not in FLAG_STORAGE_FIELDS and field.name != 'search_vector'
+]
+EXPORT_FIELDS = [*COLUMN_FIELDS, *FLAG_FIELDS]
+
+# Rows fetched per round trip (a server-side cursor on PostgreSQL), and per CSV/NDJSON write or Parquet row group
+EXPORT_CHUNK_SIZE = 2000
+
+# Pre-built exports of the whole table, rebuilt after each import
+EXPORT_DIR = str(getattr(settings, 'CIHRPT_EXPORT_DIR', os.path.join(settings.BASE_DIR, 'exports')))
+
+EXPORT_FORMATS = {
+    'csv': ('text/csv; charset=utf-8', 'csv'),
+    'ndjson': ('application/x-ndjson', 'ndjson'),
+    'parquet': ('application/vnd.apache.parquet', 'parquet'),
+}
+
+
+class ExportError(ValueError):
+    """Invalid export request; the message is returned to the client"""
+
+
+def available_formats():
+    """Export formats usable here (Parquet needs pyarrow)"""
+    return [name for name in EXPORT_FORMATS if name != 'parquet' or pa is not None]
+
+
+def parse_export_format(value):
+    export_format = value or 'csv'
+    if export_format not in EXPORT_FORMATS:
+        raise ExportError(f'format must be one of: {", ".join(EXPORT_FORMATS)}')
+    if export_format not in available_formats():
+        raise ExportError('parquet exports need pyarrow installed on the server')
+    return export_format
+
+
+def export_filters(params):
+    """Filters given in params: the API's exact-match facets, search, and flags answered 'yes'"""
+    filters = {field: params[field] for field in FACET_FIELDS if params.get(field)}
+    for field, value in filters.items():
+        # Typed facets (e.g. competition_year) must parse, or the query itself fails
+        try:
+            CIHRProject._meta.get_field(field).to_python(value)
+        except ValidationError:
+            raise ExportError(f'{field} must be a valid {CIHRProject._meta.get_field(field).description.lower()}')
+    if params.get('search'):
+        filters['search'] = params['search']
+    for name in FLAG_FIELDS:
+        value = params.get(name)
+        if value:
+            if value.lower() != 'yes':
+                raise ExportError(f'{name} can only be filtered on yes')
+            filters[name] = 'yes'
+    return filters
+
+
+def export_queryset(filters):
+    """Projects matching export_filters(), in project_id order"""
+    queryset = CIHRProject.objects.all()
+    for field, value in filters.items():
+        if field == 'search':
+            queryset = search_projects(queryset, value, rank=False)
+        elif field in FLAG_MASKS:
+            queryset = queryset.filter(flag_q(field))
+        else:
+            queryset = queryset.filter(**{field: value})
+    return queryset.order_by('project_id')
+
+
+def export_rows(queryset, chunk_size=EXPORT_CHUNK_SIZE):
+    """Tuples of EXPORT_FIELDS values, streamed from the database chunk by chunk"""
+    rows = queryset.values_list(*COLUMN_FIELDS, *FLAG_STORAGE_FIELDS).iterator(chunk_size=chunk_size)
+    for *values, flags, exceptions in rows:
+        # Same values as the flag properties: a recorded exception, else the bit
+        exceptions = exceptions or {}
+        flag_values = [
+            exceptions[name] if exceptions.get(name) is not None else ('yes' if flags & FLAG_MASKS[name] else 'no')
+            for name in FLAG_FIELDS
+        ]
+        yield (*values, *flag_values)
+
+
+def iter_csv(rows, chunk_size=EXPORT_CHUNK_SIZE):
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(EXPORT_FIELDS)
+    for chunk in chunked(rows, chunk_size):
+        writer.writerows(chunk)
+        yield buffer.getvalue().encode('utf-8')
+        buffer.seek(0)
+        buffer.truncate()
+    if buffer.tell():
+        yield buffer.getvalue().encode('utf-8')
+
+
+def iter_ndjson(rows, chunk_size=EXPORT_CHUNK_SIZE):
+    encoder = DjangoJSONEncoder(ensure_ascii=False)
+    for chunk in chunked(rows, chunk_size):
+        yield ''.join(encoder.encode(dict(zip(EXPORT_FIELDS, row))) + '\n' for row in chunk).encode('utf-8')
+
+
+class _ChunkSink(io.RawIOBase):
+    """Write-only file object whose contents are handed out with drain()"""
+
+    def __init__(self):
+        self.chunks = []
+        self.position = 0
+
+    def writable(self):
+        return True
+
+    def write(self, data):
+        data = bytes(data)
+        self.chunks.append(data)
+        self.position += len(data)
+        return len(data)
+
+    def tell(self):
+        return self.position
+
+    def drain(self):
+        data, self.chunks = b''.join(self.chunks), []
+        return data
+
+
+def parquet_schema():
+    types = {
+        'BigAutoField': pa.int64(),
+        'PositiveSmallIntegerField': pa.int16(),
+        'FloatField': pa.float64(),
+        'DateTimeField': pa.timestamp('us', tz='UTC'),
+    }
+    fields = {field.name: field for field in CIHRProject._meta.concrete_fields}
+    return pa.schema([
+        (name, types.get(fields[name].get_internal_type(), pa.string()) if name in fields else pa.string())
+        for name in EXPORT_FIELDS
+    ])
+
+
+def iter_parquet(rows, chunk_size=EXPORT_CHUNK_SIZE):
+    """Parquet file with one row group per chunk, yielded as each group is written"""
+    schema = parquet_schema()
+    sink = _ChunkSink()
+    with pq.ParquetWriter(sink, schema, compression='zstd') as writer:
+        for chunk in chunked(rows, chunk_size):
+            writer.write_table(pa.Table.from_pylist([dict(zip(EXPORT_FIELDS, row)) for row in chunk], schema=schema))
+            yield sink.drain()
+    yield sink.drain()
+
+
+WRITERS = {'csv': iter_csv, 'ndjson': iter_ndjson, 'parquet': iter_parquet}
+
+
+def stream_export(queryset, export_format, chunk_size=EXPORT_CHUNK_SIZE):
+    """Byte chunks of queryset exported as export_format, in constant memory"""
+    return WRITERS[export_format](export_rows(queryset, chunk_size), chunk_size)
+
+
+def export_filename(export_format, version=None):
+    name = f'cihr-projects-{version}' if version else 'cihr-projects'
+    return f'{name}.{EXPORT_FORMATS[export_format][1]}'
+
+
+def prebuilt_export(export_format):
+    """Path of the pre-built full export for the current data version, or None"""
+    path = os.path.join(EXPORT_DIR, export_filename(export_format, data_version()))
+    return path if os.path.exists(path) else None
+
+
+def build_exports():
+    """Write the full export in every available format for the current data version.
+
+    Files are written under a temporary name and renamed, so a request never
+    sees a partial file; exports of earlier versions are removed.
+    """
+    os.makedirs(EXPORT_DIR, exist_ok=True)
+    version = data_version()
+    paths = []
+    for export_format in available_formats():
+        path = os.path.join(EXPORT_DIR, export_filename(export_format, version))
+        handle, temporary = tempfile.mkstemp(dir=EXPORT_DIR, suffix='.tmp')
+        try:
+            with os.fdopen(handle, 'wb') as output:
+                for data in stream_export(export_queryset({}), export_format):
+                    output.write(data)
+            # mkstemp creates files readable by their owner only; web workers may run as another user
+            os.chmod(temporary, 0o644)
+            os.replace(temporary, path)
+        except BaseException:
+            os.unlink(temporary)
+            raise
+        paths.append(path)
+
+    for name in os.listdir(EXPORT_DIR):
+        path = os.path.join(EXPORT_DIR, name)
+        if name.startswith('cihr-projects-') and path not in paths:
+            os.unlink(path)
+    return paths
@@ -0,0 +1,96 @@
+"""Facet counts for the project filters, computed from one grouped query"""
+from collections import Counter
+
+from django.db.models import Count
+
+from .cache_utils import get_or_compute
+from .counts import count_cache_key
+
+
+# Filters offered as facets, in the order of the grouped query's columns
+FACET_FIELDS = ['broad_study_type', 'therapeutic_area', 'primary_institute', 'primary_theme', 'competition_year']
+
+# Placeholder values that are never offered as choices
+EMPTY_VALUES = {'', 'n/a'}
+
+# Facets with many values only offer their most common ones
+FACET_LIMITS = {'therapeutic_area': 20}
+
+
+def facet_rows(queryset, key_filters):
+    """(values, count) for every distinct combination of FACET_FIELDS in queryset.
+
+    The rows depend only on the filters that are not facets (the search), so
+    they are cached under key_filters until the next import and reused for
+    every facet selection.
+    """
+    def compute():
+        grouped = queryset.order_by().values(*FACET_FIELDS).annotate(total=Count('pk'))
+        return [(tuple(row[field] for field in FACET_FIELDS), row['total']) for row in grouped]
+
+    return get_or_compute(count_cache_key(key_filters, prefix='project_facets'), compute)
+
+
+def _matcher(field, value, contains):
+    if field == 'competition_year':
+        return lambda candidate: candidate is not None and str(candidate) == value
+    if field in contains:
+        needle = value.lower()
+        return lambda candidate: candidate is not None and needle in candidate.lower()
+    return lambda candidate: candidate == value
+
+
+def facet_counts(rows, selected, contains=()):
+    """Counter per facet, counting each facet under every selected filter except its own.
+
+    Leaving a facet's own filter out keeps its other values visible, with the
+    number of results each would give if chosen instead.
+    """
+    matchers = [
+        (position, _matcher(field, selected[field], contains))
+        for position, field in enumerate(FACET_FIELDS)
+        if selected.get(field)
+    ]
+    counts = [Counter() for _ in FACET_FIELDS]
+    for values, total in rows:
+        failed = [position for position, matches in matchers if not matches(values[position])]
+        if not failed:
+            for position, value in enumerate(values):
+                counts[position][value] += total
+        elif len(failed) == 1:
+            counts[failed[0]][values[failed[0]]] += total
+    return dict(zip(FACET_FIELDS, counts))
+
+
+def _is_empty(value):
+    return value is None or str(value).strip().lower() in EMPTY_VALUES
+
+
+def project_facets(queryset, selected, key_filters, contains=()):
+    """{field: [{'value', 'count'}, ...]} for FACET_FIELDS under the selected filters.
+
+    queryset must already carry every non-facet filter described by
+    key_filters. Values are alphabetical (competition years newest first)
+    and only those with results are listed, apart from a selected value.
+    contains names the facets whose filter is a case-insensitive substring
+    match rather than an exact one.
+    """
+    counts = facet_counts(facet_rows(queryset, key_filters), selected, contains)
+    facets = {}
+    for field in FACET_FIELDS:
+        counter = counts[field]
+        keep = selected.get(field) if field not in contains else None
+        if field == 'competition_year':
+            keep = int(keep) if keep and keep.isdigit() else None
+        if keep:
+            counter.setdefault(keep, 0)
+
+        choices = [
+            (value, count) for value, count in counter.items()
+            if (count or value == keep) and not _is_empty(value)
+        ]
+        if field in FACET_LIMITS:
+            choices = sorted(choices, key=lambda choice: -choice[1])[:FACET_LIMITS[field]]
+        choices.sort(key=lambda choice: choice[0], reverse=field == 'competition_year')
+        facets[field] = [{'value': value, 'count': count} for value, count in choices]
+    return facets
@@ -0,0 +1,431 @@
+"""Shared helpers for the CIHR data import management commands"""
+import contextlib
+import csv
+import gzip
+import hashlib
+import json
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import django
+from django.core.management import call_command
+from django.core.management.base import CommandError
+from django.db import DatabaseError, transaction
+from django.utils import timezone
+
+from .models import CIHRProject, ImportManifest
+from .cache_utils import bump_data_version
+from .exports import build_exports
+from .search import SEARCH_FIELDS, refresh_search_vectors
+from .stats import rebuild_snapshots
+from .trends import accumulate, apply_deltas, rollup_row
+
+
+# Metadata columns copied verbatim from the CIHR CSV export
+CSV_FIELDS = [
+    'project_title',
+    'principal_investigators',
+    'co_investigators',
+    'supervisors',
+    'institution_paid',
+    'research_institution',
+    'department',
+    'program',
+    'competition_year_month',
+    'peer_review_committee',
+    'primary_institute',
+    'primary_theme',
+    'term_years_months',
+    'keywords',
+    'abstract_summary',
+    'cihr_amounts',
+    'cihr_equipment',
+    'external_funding_partners',
+    'external_funding_amounts',
+]
+
+# Analysis fields from the JSON files and the default used when a key is missing
+JSON_FIELD_DEFAULTS = {
+    # Study Design Classification
+    'broad_study_type': 'unclear',
+    'narrow_study_type': '',
+    'trial_phase': 'N/A',
+    'observational_timeframe': 'N/A',
+    'justification': '',
+
+    # Data and Methodology
+    'data_type': 'unclear',
+    'ipd_used': 'unclear',
+    'novelty_statement': '',
+    'replication_study': 'no',
+
+    # Population Characteristics
+    'target_population_size': '',
+    'age_range': 'unclear',
+    'gender_focus': 'unclear',
+    'vulnerable_populations': 'no',
+    'rare_disease': 'no',
+    'population_description': '',
+
+    # Intervention Details
+    'intervention_category': '',
+    'intervention_name': '',
+    'control_type': '',
+    'dose_response': 'no',
+    'combination_therapy': 'no',
+    'personalized_medicine': 'no',
+
+    # Outcomes
+    'primary_outcome': '',
+    'primary_outcome_type': 'unclear',
+    'safety_focus': 'no',
+    'quality_of_life': 'no',
+    'biomarker_endpoints': 'no',
+    'time_to_event': 'no',
+    'composite_endpoint': 'no',
+
+    # Technology and Innovation
+    'ai_machine_learning': 'no',
+    'digital_health': 'no',
+    'telemedicine': 'no',
+    'wearable_technology': 'no',
+    'big_data_analytics': 'no',
+    'blockchain': 'no',
+
+    # Health Economics
+    'cost_effectiveness': 'no',
+    'budget_impact': 'no',
+    'health_technology_assessment': 'no',
+    'resource_utilization': 'no',
+    'productivity_outcomes': 'no',
+
+    # Implementation and Translation
+    'implementation_science': 'no',
+    'policy_evaluation': 'no',
+    'health_system_integration': 'no',
+    'scalability_assessment': 'no',
+    'barrier_identification': 'no',
+
+    # Statistical and Analytical Methods
+    'adaptive_design': 'no',
+    'bayesian_methods': 'no',
+    'machine_learning_analysis': 'no',
+    'novel_biostatistics': 'no',
+
+    # Evidence and Engagement
+    'patient_reported_outcomes': 'no',
+    'real_world_evidence': 'no',
+    'industry_partnership': 'no',
+    'patient_engagement': 'no',
+    'community_based': 'no',
+
+    # Collaboration and Ethics
+    'indigenous_collaboration': 'no',
+    'international_collaboration': 'no',
+    'international_network': 'no',
+    'regulatory_pathway': 'no',
+    'ethics_focus': 'no',
+    'consent_innovation': 'no',
+    'data_sharing': 'no',
+
+    # Clinical and Research Context
+    'therapeutic_area': '',
+    'disease_stage': 'unclear',
+    'comorbidity_focus': 'no',
+    'pandemic_related': 'no',
+    'environmental_health': 'no',
+    'social_determinants': 'no',
+    'health_equity': 'no',
+    'climate_health': 'no',
+
+    # Study Design and Conduct
+    'urban_rural': 'unclear',
+    'biobank_use': 'no',
+    'registry_linkage': 'no',
+    'cohort_establishment': 'no',
+    'platform_trial': 'no',
+    'study_duration': 'unclear',
+    'multicenter': 'no',
+    'healthcare_setting': 'unclear',
+
+    # Additional Classification
+    'disease_area': '',
+    'methodology_innovation': '',
+    'knowledge_translation_focus': 'no',
+    'equity_considerations': 'no',
+}
+
+
+def project_id_from_filename(filename):
+    """Extract the CIHR project ID from a project_<id>.json filename"""
+    return filename.replace('project_', '').replace('.json', '')
+
+
+def map_csv_row(row):
+    """Map a CSV metadata row to CIHRProject field values"""
+    return {field: row.get(field, '') for field in CSV_FIELDS}
+
+
+def map_json_data(json_data):
+    """Map a JSON analysis document to CIHRProject field values"""
+    return {field: json_data.get(field, default) for field, default in JSON_FIELD_DEFAULTS.items()}
+
+
+def content_hash(data):
+    """SHA-256 hex digest of raw bytes or of a JSON-serialisable mapping"""
+    if not isinstance(data, bytes):
+        data = json.dumps(data, sort_keys=True, default=str).encode('utf-8')
+    return hashlib.sha256(data).hexdigest()
+
+
+def load_json_file(path):
+    """Read, decode and map one analysis file.
+
+    Returns (filename, field values, error, fingerprint). Runs inside pool
+    workers, so it returns errors instead of raising them.
+    """
+    filename = os.path.basename(path)
+    try:
+        stat = os.stat(path)
+        with open(path, 'rb') as f:
+            raw = f.read()
+        json_data = json.loads(raw.decode('utf-8'))
+        fingerprint = {'mtime': stat.st_mtime, 'size': stat.st_size, 'content_hash': content_hash(raw)}
+        return filename, map_json_data(json_data), None, fingerprint
+    except Exception as e:
+        return filename, None, str(e), None
+
+
+def json_parser_pool(workers):
+    """Context manager yielding a process pool for JSON parsing, or None for in-process parsing"""
+    if workers <= 1:
+        return contextlib.nullcontext()
+    return ProcessPoolExecutor(max_workers=workers, initializer=django.setup)
+
+
+def iter_json_files(paths, pool=None, chunksize=16):
+    """Yield load_json_file() results in the same order as paths.
+
+    With a pool from json_parser_pool() the files are read and decoded in
+    worker processes while the caller consumes results as a single writer.
+    """
+    if pool is None:
+        for path in paths:
+            yield load_json_file(path)
+        return
+
+    yield from pool.map(load_json_file, paths, chunksize=chunksize)
+
+
+def open_csv(path):
+    """Open a CSV export for reading, decompressing .gz files on the fly"""
+    if str(path).endswith('.gz'):
+        return gzip.open(path, 'rt', encoding='utf-8', newline='')
+    return open(path, 'r', encoding='utf-8', newline='')
+
+
+def iter_csv_rows(path):
+    """Stream (project_id, row) pairs from a CSV export without loading it into memory"""
+    with open_csv(path) as f:
+        for row in csv.DictReader(f):
+            project_id = row.get('project_id', '').strip()
+            if project_id:
+                yield project_id, row
+
+
+def refresh_derived_data():
+    """Rebuild data derived from the project table once an import has written rows"""
+    rebuild_snapshots()
+    # Retires cached pages, counts, facets and search suggestions everywhere
+    bump_data_version()
+    # Full downloads are served from files named after the new data version
+    build_exports()
+
+
+def warm_caches(stdout, stderr):
+    """Run warm_cache after an import, warning instead of failing: the import itself succeeded"""
+    try:
+        call_command('warm_cache', skip_statistics=True, stdout=stdout, stderr=stderr)
+    except CommandError as e:
+        stderr.write(f'Cache warm-up skipped: {e}')
+
+
+class ManifestIndex:
+    """In-memory view of the import manifest for one source ('json' or 'csv').
+
+    All entries are loaded with one query. With ignore_existing=True every
+    input is treated as changed, but new fingerprints are still recorded.
+    """
+
+    def __init__(self, source, ignore_existing=False):
+        self.source = source
+        self.entries = {}
+        if not ignore_existing:
+            self.entries = {
+                key: (mtime, size, digest)
+                for key, mtime, size, digest in ImportManifest.objects.filter(source=source).values_list(
+                    'key', 'mtime', 'size', 'content_hash'
+                )
+            }
+
+    def stat_unchanged(self, key, path):
+        """True if the file still has the recorded mtime and size"""
+        entry = self.entries.get(key)
+        if entry is None:
+            return False
+        try:
+            stat = os.stat(path)
+        except OSError:
+            return False
+        return entry[0] == stat.st_mtime and entry[1] == stat.st_size
+
+    def hash_unchanged(self, key, digest):
+        entry = self.entries.get(key)
+        return entry is not None and entry[2] == digest
+
+    def entry(self, key, content_hash, mtime=None, size=None):
+        """Build an unsaved manifest entry for BulkProjectWriter.add()"""
+        return ImportManifest(source=self.source, key=key, mtime=mtime, size=size, content_hash=content_hash)
+
+
+class BulkProjectWriter:
+    """Write project rows with bulk inserts and upserts in batched transactions.
+
+    Existing project IDs are loaded once up front; each batch then fetches the
+    matching rows, creates the missing ones and updates only rows whose values
+    actually changed. Manifest entries queued with a row are saved in the same
+    transaction, so a failed batch is retried on the next incremental run.
+    Search vectors of rows whose searchable text changed are refreshed too.
+    """
+
+    def __init__(self, batch_size=500, create_missing=True, log_error=None):
+        self.batch_size = batch_size
+        self.create_missing = create_missing
+        self.log_error = log_error
+        self.fields = {field.name: field for field in CIHRProject._meta.concrete_fields}
+        self.existing_ids = set(CIHRProject.objects.values_list('project_id', flat=True))
+        self.pending = {}
+        self.pending_manifest = {}
+        self.created = 0
+        self.updated = 0
+        self.unchanged = 0
+        self.missing = 0
+        self.errors = 0
+        self.started = time.monotonic()
+
+    def add(self, project_id, values, manifest_entries=()):
+        """Queue a row for writing; later rows for the same project win"""
+        self.pending[project_id] = values
+        self.pending_manifest[project_id] = list(manifest_entries)
+        if len(self.pending) >= self.batch_size:
+            self.flush()
+
+    def flush(self):
+        """Write all queued rows in a single transaction"""
+        if not self.pending:
+            return
+        batch, self.pending = self.pending, {}
+        batch_manifest, self.pending_manifest = self.pending_manifest, {}
+
+        existing = CIHRProject.objects.in_bulk(
+            [project_id for project_id in batch if project_id in self.existing_ids],
+            field_name='project_id'
+        )
+        now = timezone.now()
+        to_create = []
+        to_update = []
+        update_fields = set()
+        manifest_entries = []
+        search_stale = []
+        # Trend rollup changes for the rows written, applied in the same transaction
+        trend_deltas = {}
+        unchanged = 0
+        missing = 0
+
+        for project_id, values in batch.items():
+            values = {
+                name: self.fields[name].to_python(value) if name in self.fields else value
+                for name, value in values.items()
+            }
+            values.update(CIHRProject.derive_values(values))
+            project = existing.get(project_id)
+
+            if project is None and not self.create_missing:
+                missing += 1
+                continue
+            manifest_entries.extend(batch_manifest[project_id])
+
+            if project is None:
+                project = CIHRProject(project_id=project_id, **values)
+                to_create.append(project)
+                accumulate(trend_deltas, rollup_row(project))
+                search_stale.append(project_id)
+                continue
+
+            changed = [name for name, value in values.items() if getattr(project, name) != value]
+            if not changed:
+                unchanged += 1
+                continue
+
+            before = rollup_row(project)
+            for name in changed:
+                setattr(project, name, values[name])
+            after = rollup_row(project)
+            if after != before:
+                accumulate(trend_deltas, before, -1)
+                accumulate(trend_deltas, after)
+            project.updated_at = now
+            update_fields.update(CIHRProject.storage_fields(changed))
+            to_update.append(project)
+            if any(name in SEARCH_FIELDS for name in changed):
+                search_stale.append(project_id)
+
+        try:
+            with transaction.atomic():
+                if to_create:
+                    CIHRProject.objects.bulk_create(to_create, batch_size=self.batch_size)
+                if to_update:
+                    # Upsert changed rows: INSERT ... ON CONFLICT DO UPDATE is far cheaper
+                    # than bulk_update(), which builds a CASE expression per field and row
+                    CIHRProject.objects.bulk_create(
+                        to_update,
+                        batch_size=self.batch_size,
+                        update_conflicts=True,
+                        unique_fields=['project_id'],
+                        update_fields=sorted(update_fields | {'updated_at'}),
+                    )
+                if manifest_entries:
+                    ImportManifest.objects.bulk_create(
+                        manifest_entries,
+                        batch_size=self.batch_size,
+                        update_conflicts=True,
+                        unique_fields=['source', 'key'],
+                        update_fields=['mtime', 'size', 'content_hash', 'updated_at'],
+                    )
+                if search_stale:
+                    # Keep the full-text search column in step (no-op off PostgreSQL)
+                    refresh_search_vectors(CIHRProject.objects.filter(project_id__in=search_stale))
+                apply_deltas(trend_deltas)
+        except DatabaseError as e:
+            self.errors += len(to_create) + len(to_update)
+            if self.log_error:
+                self.log_error(f'Error writing batch of {len(batch)} projects: {e}')
+            return
+
+        self.existing_ids.update(project.project_id for project in to_create)
+        self.created += len(to_create)
+        self.updated += len(to_update)
+        self.unchanged += unchanged
+        self.missing += missing
+
+    @property
+    def rows_written(self):
+        return self.created + self.updated
+
+    def rate_summary(self):
+        """Human readable throughput for the rows processed so far"""
+        elapsed = time.monotonic() - self.started
+        processed = self.rows_written + self.unchanged
+        rate = processed / elapsed if elapsed > 0 else 0
+        return f'{processed} rows in {elapsed:.1f}s ({rate:.0f} rows/sec)'
@@ -2,6 +2,8 @@ from django.core.management.base import BaseCommand
 from django.core.cache import cache
 from django.conf import settings
 
+from tracker.cache_utils import bump_data_version
+
 
 class Command(BaseCommand):
     help = 'Clear all cached data'
@@ -17,10 +19,17 @@ class Command(BaseCommand):
             action='store_true',
             help='List all cache keys',
         )
+        parser.add_argument(
+            '--data-version',
+            action='store_true',
+            help='Retire data-derived keys (pages, counts, facets) by bumping the data version',
+        )
 
     def handle(self, *args, **options):
         if options['list']:
             self.list_cache_keys()
+        elif options['data_version']:
+            self.bump_version()
         elif options['pattern']:
             self.clear_pattern(options['pattern'])
         else:
@@ -33,6 +42,13 @@ class Command(BaseCommand):
             self.style.SUCCESS('Successfully cleared all cache')
         )
 
+    def bump_version(self):
+        """Retire versioned keys without flushing the rest of the cache"""
+        bump_data_version()
+        self.stdout.write(
+            self.style.SUCCESS('Data version bumped; versioned cache keys retired')
+        )
+
     def clear_pattern(self, pattern):
         """Clear cache keys matching pattern"""
         try:
@@ -0,0 +1,86 @@
+import sys
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from tracker.exports import (
+    EXPORT_CHUNK_SIZE, EXPORT_FORMATS, ExportError, build_exports, export_filters, export_queryset,
+    parse_export_format, stream_export,
+)
+
+
+class Command(BaseCommand):
+    help = 'Stream the (optionally filtered) project table to a CSV, NDJSON or Parquet file'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--format',
+            choices=list(EXPORT_FORMATS),
+            default='csv',
+            help='Output format (parquet needs pyarrow)'
+        )
+        parser.add_argument(
+            '--output',
+            default='-',
+            help='File to write, or - for standard output'
+        )
+        parser.add_argument(
+            '--filter',
+            action='append',
+            default=[],
+            metavar='FIELD=VALUE',
+            help='Filter like the API: a facet field, search, or a classification field with yes (repeatable)'
+        )
+        parser.add_argument(
+            '--chunk-size',
+            type=int,
+            default=EXPORT_CHUNK_SIZE,
+            help='Rows fetched per database round trip'
+        )
+        parser.add_argument(
+            '--prebuild',
+            action='store_true',
+            help='Rebuild the full exports served by /api/export/ instead (imports do this automatically)'
+        )
+
+    def handle(self, *args, **options):
+        started = time.perf_counter()
+
+        if options['prebuild']:
+            paths = build_exports()
+            for path in paths:
+                self.stdout.write(f'  {path}')
+            self.stdout.write(self.style.SUCCESS(
+                f'Built {len(paths)} exports in {time.perf_counter() - started:.2f}s'
+            ))
+            return
+
+        try:
+            params = dict(item.split('=', 1) for item in options['filter'])
+        except ValueError:
+            raise CommandError('--filter expects FIELD=VALUE')
+        try:
+            export_format = parse_export_format(options['format'])
+            filters = export_filters(params)
+        except ExportError as e:
+            raise CommandError(str(e))
+        unknown = set(params) - set(filters)
+        if unknown:
+            raise CommandError(f'Cannot filter on: {", ".join(sorted(unknown))}')
+
+        chunks = stream_export(export_queryset(filters), export_format, options['chunk_size'])
+        written = 0
+        if options['output'] == '-':
+            for data in chunks:
+                sys.stdout.buffer.write(data)
+                written += len(data)
+            sys.stdout.buffer.flush()
+            return
+
+        with open(options['output'], 'wb') as output:
+            for data in chunks:
+                output.write(data)
+                written += len(data)
+        self.stdout.write(self.style.SUCCESS(
+            f'Wrote {written / 1024 / 1024:.1f} MB to {options["output"]} in {time.perf_counter() - started:.2f}s'
+        ))
@@ -1,8 +1,12 @@
 import csv
-import os
+from itertools import islice
 from django.core.management.base import BaseCommand
 from django.conf import settings
-from tracker.models import CIHRProject
+from tracker.importers import (
+    BulkProjectWriter, ManifestIndex, content_hash, iter_csv_rows, map_csv_row, refresh_derived_data,
+    warm_caches,
+)
+from tracker.utils import chunked
 
 
 class Command(BaseCommand):
@@ -13,7 +17,7 @@ class Command(BaseCommand):
             '--csv-file',
             type=str,
             default=settings.CIHRPT_CSV_FILE,
-            help='CSV file with project metadata'
+            help='CSV file with project metadata (may be gzip-compressed)'
         )
         parser.add_argument(
             '--limit',
@@ -25,98 +29,94 @@ class Command(BaseCommand):
             action='store_true',
             help='Update existing projects instead of skipping them'
         )
+        parser.add_argument(
+            '--chunk-size',
+            type=int,
+            default=1000,
+            help='Number of CSV rows held in memory at a time'
+        )
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=500,
+            help='Number of projects written per bulk insert/update transaction'
+        )
+        parser.add_argument(
+            '--warm-cache',
+            action='store_true',
+            help='Pre-render the hot pages into the cache once the import has written rows'
+        )
 
     def handle(self, *args, **options):
         csv_file = options['csv_file']
         limit = options['limit']
         update_existing = options['update_existing']
-        
-        self.stdout.write(f'Loading CSV metadata from: {csv_file}')
-        
-        # Load CSV data
-        csv_data = []
+        chunk_size = options['chunk_size']
+        batch_size = options['batch_size']
+
+        self.stdout.write(f'Streaming CSV metadata from: {csv_file}')
+
+        # Rows are read lazily and processed in bounded chunks
+        csv_rows = iter_csv_rows(csv_file)
+        if limit:
+            csv_rows = islice(csv_rows, limit)
+            self.stdout.write(f'Limited to {limit} projects for processing')
+
+        # Existing project IDs are loaded once and each chunk is split into
+        # create/update/skip sets that are applied with bulk operations
+        writer = BulkProjectWriter(batch_size=batch_size, log_error=self.stderr.write)
+        csv_manifest = ManifestIndex('csv', ignore_existing=True)
+        seen_ids = set()
+        skipped_ids = []
+        processed = 0
+
         try:
-            with open(csv_file, 'r', encoding='utf-8') as f:
-                reader = csv.DictReader(f)
-                for row in reader:
-                    project_id = row.get('project_id', '').strip()
-                    if project_id:
-                        csv_data.append(row)
-        except Exception as e:
+            for chunk in chunked(csv_rows, chunk_size):
+                self.stdout.write(f'Processed {processed} rows...')
+                processed += len(chunk)
+
+                for project_id, row in chunk:
+                    exists = project_id in writer.existing_ids or project_id in seen_ids
+                    seen_ids.add(project_id)
+
+                    if exists and not update_existing:
+                        skipped_ids.append(project_id)
+                        continue
+
+                    # CSV fields only; JSON fields keep their current values or defaults
+                    project_data = map_csv_row(row)
+                    writer.add(project_id, project_data, [csv_manifest.entry(project_id, content_hash(project_data))])
+        except (OSError, EOFError, UnicodeDecodeError, csv.Error) as e:
+            # Rows read before the error are kept, so derived data must follow them
+            writer.flush()
+            if writer.rows_written:
+                refresh_derived_data()
+                self.stdout.write(f'Statistics and search suggestions refreshed for {writer.rows_written} rows written')
             self.stderr.write(f'Error reading CSV file: {e}')
             return
-        
-        self.stdout.write(f'Loaded {len(csv_data)} projects from CSV')
-        
-        if limit:
-            csv_data = csv_data[:limit]
-            self.stdout.write(f'Limited to {limit} projects for processing')
-        
-        created_count = 0
-        updated_count = 0
-        skipped_count = 0
-        error_count = 0
-        
-        for i, row in enumerate(csv_data):
-            if i % 50 == 0:
-                self.stdout.write(f'Processed {i}/{len(csv_data)} rows...')
-            
-            try:
-                project_id = row.get('project_id', '').strip()
-                
-                # Check if project already exists
-                existing_project = CIHRProject.objects.filter(project_id=project_id).first()
-                
-                if existing_project and not update_existing:
-                    skipped_count += 1
-                    continue
-                
-                # Prepare project data (CSV fields only, JSON fields get defaults)
-                project_data = {
-                    # Basic information from CSV
-                    'project_title': row.get('project_title', ''),
-                    'principal_investigators': row.get('principal_investigators', ''),
-                    'co_investigators': row.get('co_investigators', ''),
-                    'supervisors': row.get('supervisors', ''),
-                    'institution_paid': row.get('institution_paid', ''),
-                    'research_institution': row.get('research_institution', ''),
-                    'department': row.get('department', ''),
-                    'program': row.get('program', ''),
-                    'competition_year_month': row.get('competition_year_month', ''),
-                    'peer_review_committee': row.get('peer_review_committee', ''),
-                    'primary_institute': row.get('primary_institute', ''),
-                    'primary_theme': row.get('primary_theme', ''),
-                    'term_years_months': row.get('term_years_months', ''),
-                    'keywords': row.get('keywords', ''),
-                    'abstract_summary': row.get('abstract_summary', ''),
-                    'cihr_amounts': row.get('cihr_amounts', ''),
-                    'cihr_equipment': row.get('cihr_equipment', ''),
-                    'external_funding_partners': row.get('external_funding_partners', ''),
-                    'external_funding_amounts': row.get('external_funding_amounts', ''),
-                }
-                
-                # Create or update project
-                if existing_project:
-                    # Update existing project (only CSV fields)
-                    for field, value in project_data.items():
-                        setattr(existing_project, field, value)
-                    existing_project.save()
-                    updated_count += 1
-                else:
-                    # Create new project
-                    CIHRProject.objects.create(
-                        project_id=project_id,
-                        **project_data
-                    )
-                    created_count += 1
-                    
-            except Exception as e:
-                error_count += 1
-                self.stderr.write(f'Error processing project {project_id}: {e}')
-        
+
+        writer.flush()
+
+        self.stdout.write('Summary diff:')
+        self.stdout.write(f'  + {writer.created} projects created')
+        self.stdout.write(f'  ~ {writer.updated} projects updated')
+        self.stdout.write(f'  = {writer.unchanged} projects unchanged')
+        self.stdout.write(f'  - {len(skipped_ids)} existing projects skipped (use --update-existing to update)')
+        if skipped_ids and options['verbosity'] > 1:
+            self.stdout.write(f'    Skipped: {", ".join(skipped_ids[:20])}{" ..." if len(skipped_ids) > 20 else ""}')
+
         self.stdout.write(
             self.style.SUCCESS(
-                f'CSV import completed! Created: {created_count}, Updated: {updated_count}, '
-                f'Skipped: {skipped_count}, Errors: {error_count}'
+                f'CSV import completed! Processed: {processed}, Created: {writer.created}, '
+                f'Updated: {writer.updated}, Unchanged: {writer.unchanged}, '
+                f'Skipped: {len(skipped_ids)}, Errors: {writer.errors}'
             )
-        ) 
\ No newline at end of file
+        )
+        self.stdout.write(f'Processed {writer.rate_summary()}')
+
+        # Derived statistics and suggestions only change when rows were written
+        if writer.rows_written:
+            refresh_derived_data()
+            self.stdout.write('Statistics and search suggestions refreshed')
+            if options['warm_cache']:
+                warm_caches(self.stdout, self.stderr)
@@ -6,6 +6,7 @@ from django.core.cache import cache
 import time
 import sys
 
+from tracker.cache_utils import local_cache_stats
 from tracker.views import home, project_list, statistics
 from tracker.models import CIHRProject
 
@@ -173,6 +174,14 @@ class Command(BaseCommand):
         else:
             self.stdout.write(self.style.ERROR('Cache integrity: FAILED'))
         
+        # In-process tier in front of the shared cache; this command's counters cover its own
+        # lookups only, a web worker's are served at /api/cache-stats/
+        local = local_cache_stats()
+        self.stdout.write(
+            f'Local cache: {local["size"]}/{local["max_entries"]} entries, '
+            f'{local["hits"]} hits, {local["misses"]} misses ({local["hit_ratio"]:.0%} hit ratio)'
+        )
+        
         # Test cache backend type
         from django.conf import settings
         cache_backend = settings.CACHES['default']['BACKEND']
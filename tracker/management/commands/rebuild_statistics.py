@@ -0,0 +1,26 @@
+from django.core.management.base import BaseCommand
+from tracker.cache_utils import bump_data_version
+from tracker.stats import rebuild_snapshots
+from tracker.trends import rebuild_trends
+
+
+class Command(BaseCommand):
+    help = 'Recompute the precomputed statistics snapshots and trend rollups'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--skip-trends',
+            action='store_true',
+            help='Do not rebuild the trend rollup table (importers keep it up to date)'
+        )
+
+    def handle(self, *args, **options):
+        snapshots = rebuild_snapshots()
+        if not options['skip_trends']:
+            rows = rebuild_trends()
+            self.stdout.write(f'Rebuilt {rows} trend rollup rows')
+        # Processes hold snapshots in memory until the data version changes
+        bump_data_version()
+        self.stdout.write(
+            self.style.SUCCESS(f'Rebuilt {len(snapshots)} statistics snapshots: {", ".join(snapshots)}')
+        )
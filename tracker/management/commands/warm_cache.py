@@ -0,0 +1,117 @@
+import time
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import urlsplit
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connections
+from django.test import Client, RequestFactory
+from django.urls import reverse
+from rest_framework.request import Request
+
+from tracker.models import CIHRProject
+from tracker.pagination import ProjectCursorPagination
+from tracker.stats import rebuild_snapshots
+
+
+# Pages rendered on every warm-up, besides the first project_list pages
+HOT_PAGES = ['tracker:home', 'tracker:statistics', 'tracker:institutions', 'tracker:cihr_institutes']
+
+
+class Command(BaseCommand):
+    help = (
+        'Compute statistics snapshots and pre-render the hot pages into the cache '
+        '(only reaches the web processes through a shared backend such as Redis)'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--project-pages',
+            type=int,
+            default=3,
+            help='Number of project_list pages to pre-render (following the keyset cursors)'
+        )
+        parser.add_argument(
+            '--host',
+            action='append',
+            help='Host name to render pages for (repeatable; defaults to every ALLOWED_HOSTS entry)'
+        )
+        parser.add_argument(
+            '--scheme',
+            choices=['http', 'https'],
+            default='http' if settings.DEBUG else 'https',
+            help='Scheme visitors use; it is part of the page cache key'
+        )
+        parser.add_argument(
+            '--workers',
+            type=int,
+            default=4,
+            help='Number of pages rendered in parallel'
+        )
+        parser.add_argument(
+            '--skip-statistics',
+            action='store_true',
+            help='Do not recompute the statistics snapshots (e.g. right after an import rebuilt them)'
+        )
+
+    def handle(self, *args, **options):
+        started = time.perf_counter()
+
+        if not options['skip_statistics']:
+            start = time.perf_counter()
+            snapshots = rebuild_snapshots()
+            self.report(f'statistics ({", ".join(snapshots)})', time.perf_counter() - start)
+
+        # Page cache keys include the host and scheme, so each is rendered separately
+        hosts = options['host'] or [
+            host for host in settings.ALLOWED_HOSTS if host and host != '*' and not host.startswith('.')
+        ]
+        if not hosts:
+            raise CommandError('ALLOWED_HOSTS has no literal host name to render pages for; pass --host')
+        paths = [reverse(name) for name in HOT_PAGES]
+        paths += self.project_list_paths(options['project_pages'], hosts[0])
+        jobs = [(host, path) for host in hosts for path in paths]
+
+        self.stdout.write(f'Rendering {len(paths)} pages for {len(hosts)} hosts with {options["workers"]} workers')
+        secure = options['scheme'] == 'https'
+        failures = 0
+        with ThreadPoolExecutor(max_workers=max(options['workers'], 1)) as executor:
+            for host, path, status, elapsed in executor.map(lambda job: self.render(*job, secure), jobs):
+                if status != 200:
+                    failures += 1
+                self.report(f'{host}{path} [{status}]', elapsed, ok=status == 200)
+
+        summary = f'Warmed {len(jobs) - failures}/{len(jobs)} pages in {time.perf_counter() - started:.2f}s'
+        self.stdout.write(self.style.SUCCESS(summary) if not failures else self.style.WARNING(summary))
+
+    def project_list_paths(self, pages, host):
+        """Paths of the first project_list pages, in the default keyset order"""
+        path = reverse('tracker:project_list')
+        paths = []
+        paginator = ProjectCursorPagination()
+        queryset = CIHRProject.objects.only('project_id')
+        while path and len(paths) < pages:
+            paths.append(path)
+            paginator.paginate_queryset(queryset, Request(RequestFactory(HTTP_HOST=host).get(path)))
+            next_url = paginator.get_next_link()
+            path = None
+            if next_url:
+                parts = urlsplit(next_url)
+                path = f'{parts.path}?{parts.query}'
+        return paths
+
+    def render(self, host, path, secure):
+        """GET path through the full middleware stack so the page cache is filled"""
+        start = time.perf_counter()
+        try:
+            status = Client(HTTP_HOST=host).get(path, secure=secure).status_code
+        except Exception as e:
+            self.stderr.write(f'Error rendering {host}{path}: {e}')
+            status = 'error'
+        finally:
+            connections.close_all()
+        return host, path, status, time.perf_counter() - start
+
+    def report(self, label, elapsed, ok=True):
+        line = f'  {label}: {elapsed * 1000:.0f} ms'
+        self.stdout.write(line if ok else self.style.WARNING(line))
@@ -0,0 +1,71 @@
+# Generated by Django 5.2.4 on 2026-10-17 10:30
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("tracker", "0003_add_performance_indexes"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="ImportManifest",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                (
+                    "source",
+                    models.CharField(
+                        choices=[("json", "JSON file"), ("csv", "CSV row")],
+                        max_length=10,
+                    ),
+                ),
+                (
+                    "key",
+                    models.CharField(
+                        help_text="JSON filename or CSV project_id", max_length=255
+                    ),
+                ),
+                (
+                    "mtime",
+                    models.FloatField(
+                        blank=True,
+                        help_text="File modification time when imported",
+                        null=True,
+                    ),
+                ),
+                (
+                    "size",
+                    models.BigIntegerField(
+                        blank=True,
+                        help_text="File size in bytes when imported",
+                        null=True,
+                    ),
+                ),
+                (
+                    "content_hash",
+                    models.CharField(
+                        help_text="SHA-256 of the imported content", max_length=64
+                    ),
+                ),
+                ("updated_at", models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                "db_table": "cihr_import_manifest",
+                "constraints": [
+                    models.UniqueConstraint(
+                        fields=("source", "key"), name="unique_import_manifest_entry"
+                    )
+                ],
+            },
+        ),
+    ]
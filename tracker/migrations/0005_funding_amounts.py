@@ -0,0 +1,68 @@
+# Generated by Django 5.2.4 on 2026-10-17 10:34
+
+from django.db import migrations, models
+
+
+# Frozen copy of tracker.models.parse_funding_amount at the time of this migration
+def parse_funding_amount(amount_str):
+    if not amount_str or amount_str.upper() in ["N/A", "NULL", ""]:
+        return None
+    try:
+        cleaned = (
+            str(amount_str).replace("$", "").replace(",", "").replace('"', "").strip()
+        )
+        # Semicolon-separated values: the first one is used
+        if ";" in cleaned:
+            cleaned = cleaned.split(";")[0].strip()
+        return float(cleaned) if cleaned else None
+    except (ValueError, TypeError):
+        return None
+
+
+def backfill_funding_amounts(apps, schema_editor):
+    CIHRProject = apps.get_model("tracker", "CIHRProject")
+    batch = []
+    for project in CIHRProject.objects.only(
+        "pk", "cihr_amounts", "cihr_equipment"
+    ).iterator(chunk_size=2000):
+        project.funding_amount = parse_funding_amount(project.cihr_amounts)
+        project.equipment_amount = parse_funding_amount(project.cihr_equipment)
+        batch.append(project)
+        if len(batch) >= 2000:
+            CIHRProject.objects.bulk_update(
+                batch, ["funding_amount", "equipment_amount"]
+            )
+            batch = []
+    if batch:
+        CIHRProject.objects.bulk_update(batch, ["funding_amount", "equipment_amount"])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("tracker", "0004_import_manifest"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="cihrproject",
+            name="equipment_amount",
+            field=models.FloatField(
+                blank=True, help_text="Parsed CIHR equipment funding", null=True
+            ),
+        ),
+        migrations.AddField(
+            model_name="cihrproject",
+            name="funding_amount",
+            field=models.FloatField(
+                blank=True, help_text="Parsed CIHR funding amount", null=True
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="cihrproject",
+            index=models.Index(
+                fields=["funding_amount"], name="cihr_projec_funding_0ef387_idx"
+            ),
+        ),
+        migrations.RunPython(backfill_funding_amounts, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,83 @@
+# Generated by Django 5.2.4 on 2026-10-17 10:35
+
+import re
+
+from django.db import migrations, models
+
+# Frozen copies of the tracker.models parsers at the time of this migration
+COMPETITION_DATE_RE = re.compile(r"^\s*(\d{4})(?:\D?(\d{1,2}))?")
+
+
+def parse_competition_year(value):
+    match = COMPETITION_DATE_RE.match(value or "")
+    return int(match.group(1)) if match else None
+
+
+def parse_competition_month(value):
+    match = COMPETITION_DATE_RE.match(value or "")
+    if not match or not match.group(2):
+        return None
+    month = int(match.group(2))
+    return month if 1 <= month <= 12 else None
+
+
+def backfill_competition_dates(apps, schema_editor):
+    CIHRProject = apps.get_model("tracker", "CIHRProject")
+    batch = []
+    for project in CIHRProject.objects.only("pk", "competition_year_month").iterator(
+        chunk_size=2000
+    ):
+        project.competition_year = parse_competition_year(
+            project.competition_year_month
+        )
+        project.competition_month = parse_competition_month(
+            project.competition_year_month
+        )
+        batch.append(project)
+        if len(batch) >= 2000:
+            CIHRProject.objects.bulk_update(
+                batch, ["competition_year", "competition_month"]
+            )
+            batch = []
+    if batch:
+        CIHRProject.objects.bulk_update(
+            batch, ["competition_year", "competition_month"]
+        )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("tracker", "0005_funding_amounts"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="cihrproject",
+            name="competition_month",
+            field=models.PositiveSmallIntegerField(
+                blank=True, help_text="Parsed competition month", null=True
+            ),
+        ),
+        migrations.AddField(
+            model_name="cihrproject",
+            name="competition_year",
+            field=models.PositiveSmallIntegerField(
+                blank=True, help_text="Parsed competition year", null=True
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="cihrproject",
+            index=models.Index(
+                fields=["competition_year"], name="cihr_projec_competi_076455_idx"
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="cihrproject",
+            index=models.Index(
+                fields=["competition_year", "broad_study_type"],
+                name="cihr_projec_competi_1fb357_idx",
+            ),
+        ),
+        migrations.RunPython(backfill_competition_dates, migrations.RunPython.noop),
+    ]
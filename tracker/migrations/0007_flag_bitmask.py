@@ -0,0 +1,354 @@
+# Generated by Django 5.2.4 on 2026-10-17 10:39
+
+from django.db import migrations, models
+
+# Frozen copy of tracker.models.FLAG_FIELDS at the time of this migration:
+# a flag's bit in CIHRProject.flags is its position in this list
+FLAG_FIELDS = [
+    "replication_study",
+    "vulnerable_populations",
+    "rare_disease",
+    "dose_response",
+    "combination_therapy",
+    "personalized_medicine",
+    "safety_focus",
+    "quality_of_life",
+    "biomarker_endpoints",
+    "time_to_event",
+    "composite_endpoint",
+    "ai_machine_learning",
+    "digital_health",
+    "telemedicine",
+    "wearable_technology",
+    "big_data_analytics",
+    "blockchain",
+    "cost_effectiveness",
+    "budget_impact",
+    "health_technology_assessment",
+    "resource_utilization",
+    "productivity_outcomes",
+    "implementation_science",
+    "policy_evaluation",
+    "health_system_integration",
+    "scalability_assessment",
+    "barrier_identification",
+    "adaptive_design",
+    "bayesian_methods",
+    "machine_learning_analysis",
+    "novel_biostatistics",
+    "patient_reported_outcomes",
+    "real_world_evidence",
+    "industry_partnership",
+    "patient_engagement",
+    "community_based",
+    "indigenous_collaboration",
+    "international_collaboration",
+    "international_network",
+    "regulatory_pathway",
+    "ethics_focus",
+    "consent_innovation",
+    "data_sharing",
+    "comorbidity_focus",
+    "pandemic_related",
+    "environmental_health",
+    "social_determinants",
+    "health_equity",
+    "climate_health",
+    "biobank_use",
+    "registry_linkage",
+    "cohort_establishment",
+    "platform_trial",
+    "multicenter",
+    "knowledge_translation_focus",
+    "equity_considerations",
+]
+
+
+def pack_flags(apps, schema_editor):
+    CIHRProject = apps.get_model("tracker", "CIHRProject")
+    batch = []
+    for project in CIHRProject.objects.only("pk", *FLAG_FIELDS).iterator(
+        chunk_size=2000
+    ):
+        project.flags = 0
+        project.flag_exceptions = {}
+        for bit, name in enumerate(FLAG_FIELDS):
+            value = getattr(project, name)
+            if value == "yes":
+                project.flags |= 1 << bit
+            elif value != "no":
+                project.flag_exceptions[name] = value
+        batch.append(project)
+        if len(batch) >= 2000:
+            CIHRProject.objects.bulk_update(batch, ["flags", "flag_exceptions"])
+            batch = []
+    if batch:
+        CIHRProject.objects.bulk_update(batch, ["flags", "flag_exceptions"])
+
+
+def unpack_flags(apps, schema_editor):
+    CIHRProject = apps.get_model("tracker", "CIHRProject")
+    batch = []
+    for project in CIHRProject.objects.only("pk", "flags", "flag_exceptions").iterator(
+        chunk_size=2000
+    ):
+        for bit, name in enumerate(FLAG_FIELDS):
+            value = project.flag_exceptions.get(name)
+            if value is None:
+                value = "yes" if project.flags & (1 << bit) else "no"
+            setattr(project, name, value)
+        batch.append(project)
+        if len(batch) >= 2000:
+            CIHRProject.objects.bulk_update(batch, FLAG_FIELDS)
+            batch = []
+    if batch:
+        CIHRProject.objects.bulk_update(batch, FLAG_FIELDS)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("tracker", "0006_competition_year"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="cihrproject",
+            name="flag_exceptions",
+            field=models.JSONField(
+                blank=True, default=dict, help_text="Flag values other than yes/no"
+            ),
+        ),
+        migrations.AddField(
+            model_name="cihrproject",
+            name="flags",
+            field=models.BigIntegerField(
+                default=0, help_text="Bitmask of classification flags set to 'yes'"
+            ),
+        ),
+        migrations.RunPython(pack_flags, unpack_flags),
+        migrations.RemoveField(
+            model_name="cihrproject",
+            name="adaptive_design",
+        ),
+        migrations.RemoveField(
+            model_name="cihrproject",
+            name="ai_machine_learning",
+        ),
+        migrations.RemoveField(
+            model_name="cihrproject",
+            name="barrier_identification",
+        ),
+        migrations.RemoveField(
+            model_name="cihrproject",
+            name="bayesian_methods",
+        ),
+        migrations.RemoveField(
+            model_name="cihrproject",
+            name="big_data_analytics",
+        ),
+        migrations.RemoveField(
+            model_name="cihrproject",
+            name="biobank_use",
+        ),
+        migrations.RemoveField(
+            model_name="cihrproject",
+            name="biomarker_endpoints",
+        ),
+        migrations.RemoveField(
+            model_name="cihrproject",
+            name="blockchain",
+        ),
+        migrations.RemoveField(
+            model_name="cihrproject",
+            name="budget_impact",
+        ),
+        migrations.RemoveField(
+            model_name="cihrproject",
+            name="climate_health",
+        ),
+        migrations.RemoveField(
+            model_name="cihrproject",
+            name="cohort_establishment",
+        ),
+        migrations.RemoveField(
+            model_name="cihrproject",
+            name="combination_therapy",
+        ),
+        migrations.RemoveField(
+            model_name="cihrproject",
+            name="community_based",
+        ),
+        migrations.RemoveField(
+            model_name="cihrproject",
+            name="comorbidity_focus",
+        ),
+        migrations.RemoveField(
+            model_name="cihrproject",
+            name="composite_endpoint",
+        ),
+        migrations.RemoveField(
+            model_name="cihrproject",
+            name="consent_innovation",
+        ),
+        migrations.RemoveField(
+            model_name="cihrproject",
+            name="cost_effectiveness",
+        ),
+        migrations.RemoveField(
+            model_name="cihrproject",
+            name="data_sharing",
+        ),
+        migrations.RemoveField(
+            model_name="cihrproject",
+            name="digital_health",
+        ),
+        migrations.RemoveField(
+            model_name="cihrproject",
+            name="dose_response",
+        ),
+        migrations.RemoveField(
+            model_name="cihrproject",
+            name="environmental_health",
+        ),
+        migrations.RemoveField(
+            model_name="cihrproject",
+            name="equity_considerations",
+        ),
+        migrations.RemoveField(
+            model_name="cihrproject",
+            name="ethics_focus",
+        ),
+        migrations.RemoveField(
+            model_name="cihrproject",
+            name="health_equity",
+        ),
+        migrations.RemoveField(
+            model_name="cihrproject",
+            name="health_system_integration",
+        ),
+        migrations.RemoveField(
+            model_name="cihrproject",
+            name="health_technology_assessment",
+        ),
+        migrations.RemoveField(
+            model_name="cihrproject",
+            name="implementation_science",
+        ),
+        migrations.RemoveField(
+            model_name="cihrproject",
+            name="indigenous_collaboration",
+        ),
+        migrations.RemoveField(
+            model_name="cihrproject",
+            name="industry_partnership",
+        ),
+        migrations.RemoveField(
+            model_name="cihrproject",
+            name="international_collaboration",
+        ),
+        migrations.RemoveField(
+            model_name="cihrproject",
+            name="international_network",
+        ),
+        migrations.RemoveField(
+            model_name="cihrproject",
+            name="knowledge_translation_focus",
+        ),
+        migrations.RemoveField(
+            model_name="cihrproject",
+            name="machine_learning_analysis",
+        ),
+        migrations.RemoveField(
+            model_name="cihrproject",
+            name="multicenter",
+        ),
+        migrations.RemoveField(
+            model_name="cihrproject",
+            name="novel_biostatistics",
+        ),
+        migrations.RemoveField(
+            model_name="cihrproject",
+            name="pandemic_related",
+        ),
+        migrations.RemoveField(
+            model_name="cihrproject",
+            name="patient_engagement",
+        ),
+        migrations.RemoveField(
+            model_name="cihrproject",
+            name="patient_reported_outcomes",
+        ),
+        migrations.RemoveField(
+            model_name="cihrproject",
+            name="personalized_medicine",
+        ),
+        migrations.RemoveField(
+            model_name="cihrproject",
+            name="platform_trial",
+        ),
+        migrations.RemoveField(
+            model_name="cihrproject",
+            name="policy_evaluation",
+        ),
+        migrations.RemoveField(
+            model_name="cihrproject",
+            name="productivity_outcomes",
+        ),
+        migrations.RemoveField(
+            model_name="cihrproject",
+            name="quality_of_life",
+        ),
+        migrations.RemoveField(
+            model_name="cihrproject",
+            name="rare_disease",
+        ),
+        migrations.RemoveField(
+            model_name="cihrproject",
+            name="real_world_evidence",
+        ),
+        migrations.RemoveField(
+            model_name="cihrproject",
+            name="registry_linkage",
+        ),
+        migrations.RemoveField(
+            model_name="cihrproject",
+            name="regulatory_pathway",
+        ),
+        migrations.RemoveField(
+            model_name="cihrproject",
+            name="replication_study",
+        ),
+        migrations.RemoveField(
+            model_name="cihrproject",
+            name="resource_utilization",
+        ),
+        migrations.RemoveField(
+            model_name="cihrproject",
+            name="safety_focus",
+        ),
+        migrations.RemoveField(
+            model_name="cihrproject",
+            name="scalability_assessment",
+        ),
+        migrations.RemoveField(
+            model_name="cihrproject",
+            name="social_determinants",
+        ),
+        migrations.RemoveField(
+            model_name="cihrproject",
+            name="telemedicine",
+        ),
+        migrations.RemoveField(
+            model_name="cihrproject",
+            name="time_to_event",
+        ),
+        migrations.RemoveField(
+            model_name="cihrproject",
+            name="vulnerable_populations",
+        ),
+        migrations.RemoveField(
+            model_name="cihrproject",
+            name="wearable_technology",
+        ),
+    ]
@@ -0,0 +1,45 @@
+# Generated by Django 5.2.4 on 2026-10-17 10:41
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("tracker", "0007_flag_bitmask"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="StatisticsSnapshot",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                (
+                    "key",
+                    models.CharField(
+                        help_text="Statistics name, e.g. 'home' or 'statistics'",
+                        max_length=50,
+                        unique=True,
+                    ),
+                ),
+                (
+                    "payload",
+                    models.TextField(
+                        help_text="JSON-encoded statistics (stored as text to keep key order)"
+                    ),
+                ),
+                ("updated_at", models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                "db_table": "cihr_statistics_snapshot",
+            },
+        ),
+    ]
@@ -0,0 +1,49 @@
+# Generated by Django 5.2.4 on 2026-10-17 10:43
+
+import django.contrib.postgres.search
+from django.contrib.postgres.search import SearchVector
+from django.db import migrations
+
+SEARCH_INDEX_NAME = "cihr_projects_search_vector_gin"
+
+
+def create_search_index(apps, schema_editor):
+    # tsvector and GIN indexes only exist on PostgreSQL; SQLite keeps the
+    # column empty and tracker.search falls back to icontains lookups
+    if schema_editor.connection.vendor != "postgresql":
+        return
+    CIHRProject = apps.get_model("tracker", "CIHRProject")
+    CIHRProject.objects.update(
+        search_vector=SearchVector("project_title", weight="A", config="english")
+        + SearchVector("keywords", weight="B", config="english")
+        + SearchVector("principal_investigators", weight="B", config="english")
+        + SearchVector("abstract_summary", weight="C", config="english")
+    )
+    schema_editor.execute(
+        f"CREATE INDEX IF NOT EXISTS {SEARCH_INDEX_NAME} "
+        "ON cihr_projects USING gin (search_vector)"
+    )
+
+
+def drop_search_index(apps, schema_editor):
+    if schema_editor.connection.vendor != "postgresql":
+        return
+    schema_editor.execute(f"DROP INDEX IF EXISTS {SEARCH_INDEX_NAME}")
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("tracker", "0008_statistics_snapshot"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="cihrproject",
+            name="search_vector",
+            field=django.contrib.postgres.search.SearchVectorField(
+                blank=True, editable=False, null=True
+            ),
+        ),
+        migrations.RunPython(create_search_index, drop_search_index),
+    ]
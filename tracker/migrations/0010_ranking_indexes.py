@@ -0,0 +1,27 @@
+# Generated by Django 5.2.4 on 2026-10-17 10:57
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("tracker", "0009_search_vector"),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name="cihrproject",
+            index=models.Index(
+                fields=["research_institution", "funding_amount"],
+                name="cihr_projec_researc_fa0485_idx",
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="cihrproject",
+            index=models.Index(
+                fields=["primary_institute", "funding_amount"],
+                name="cihr_projec_primary_a45c58_idx",
+            ),
+        ),
+    ]
@@ -0,0 +1,185 @@
+# Generated by Django 5.2.4 on 2026-10-17 11:01
+
+from django.db import migrations, models
+
+# Frozen copies of the tracker.trends rollup rules at the time of this migration:
+# a flag's bit in CIHRProject.flags is its position in FLAG_FIELDS
+FLAG_FIELDS = [
+    "replication_study",
+    "vulnerable_populations",
+    "rare_disease",
+    "dose_response",
+    "combination_therapy",
+    "personalized_medicine",
+    "safety_focus",
+    "quality_of_life",
+    "biomarker_endpoints",
+    "time_to_event",
+    "composite_endpoint",
+    "ai_machine_learning",
+    "digital_health",
+    "telemedicine",
+    "wearable_technology",
+    "big_data_analytics",
+    "blockchain",
+    "cost_effectiveness",
+    "budget_impact",
+    "health_technology_assessment",
+    "resource_utilization",
+    "productivity_outcomes",
+    "implementation_science",
+    "policy_evaluation",
+    "health_system_integration",
+    "scalability_assessment",
+    "barrier_identification",
+    "adaptive_design",
+    "bayesian_methods",
+    "machine_learning_analysis",
+    "novel_biostatistics",
+    "patient_reported_outcomes",
+    "real_world_evidence",
+    "industry_partnership",
+    "patient_engagement",
+    "community_based",
+    "indigenous_collaboration",
+    "international_collaboration",
+    "international_network",
+    "regulatory_pathway",
+    "ethics_focus",
+    "consent_innovation",
+    "data_sharing",
+    "comorbidity_focus",
+    "pandemic_related",
+    "environmental_health",
+    "social_determinants",
+    "health_equity",
+    "climate_health",
+    "biobank_use",
+    "registry_linkage",
+    "cohort_establishment",
+    "platform_trial",
+    "multicenter",
+    "knowledge_translation_focus",
+    "equity_considerations",
+]
+TREND_DIMENSIONS = [
+    "broad_study_type",
+    "therapeutic_area",
+    "primary_institute",
+    "primary_theme",
+]
+ROLLUP_FIELDS = ["competition_year", "funding_amount", *TREND_DIMENSIONS, "flags"]
+
+
+def is_blank(value):
+    return value is None or (
+        isinstance(value, str) and value.strip().lower() in ("", "n/a")
+    )
+
+
+def accumulate(totals, row):
+    year, funding, *values, flags = row
+    if year is None:
+        return
+    keys = [(year, "all", "")]
+    keys += [
+        (year, dimension, value)
+        for dimension, value in zip(TREND_DIMENSIONS, values)
+        if not is_blank(value)
+    ]
+    keys += [
+        (year, "flag", name)
+        for bit, name in enumerate(FLAG_FIELDS)
+        if (flags or 0) & (1 << bit)
+    ]
+    funded = funding is not None and funding > 0
+    for key in keys:
+        entry = totals.setdefault(key, [0, 0, 0.0])
+        entry[0] += 1
+        entry[1] += 1 if funded else 0
+        entry[2] += funding if funded else 0.0
+
+
+def backfill_trend_rollups(apps, schema_editor):
+    CIHRProject = apps.get_model("tracker", "CIHRProject")
+    TrendRollup = apps.get_model("tracker", "TrendRollup")
+    totals = {}
+    for row in CIHRProject.objects.values_list(*ROLLUP_FIELDS).iterator(
+        chunk_size=2000
+    ):
+        accumulate(totals, row)
+    TrendRollup.objects.bulk_create(
+        [
+            TrendRollup(
+                year=year,
+                dimension=dimension,
+                value=value,
+                project_count=count,
+                funded_count=funded,
+                funding_total=funding,
+            )
+            for (year, dimension, value), (count, funded, funding) in totals.items()
+        ],
+        batch_size=2000,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("tracker", "0010_ranking_indexes"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="TrendRollup",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                (
+                    "year",
+                    models.PositiveSmallIntegerField(help_text="Competition year"),
+                ),
+                (
+                    "dimension",
+                    models.CharField(
+                        help_text="Grouping field, 'all' for yearly totals or 'flag'",
+                        max_length=50,
+                    ),
+                ),
+                (
+                    "value",
+                    models.CharField(
+                        blank=True,
+                        help_text="Field value, or flag name for 'flag'",
+                        max_length=300,
+                    ),
+                ),
+                ("project_count", models.PositiveIntegerField(default=0)),
+                (
+                    "funded_count",
+                    models.PositiveIntegerField(
+                        default=0, help_text="Projects with a positive funding amount"
+                    ),
+                ),
+                ("funding_total", models.FloatField(default=0)),
+            ],
+            options={
+                "db_table": "cihr_trend_rollup",
+                "constraints": [
+                    models.UniqueConstraint(
+                        fields=("dimension", "value", "year"),
+                        name="unique_trend_rollup_entry",
+                    )
+                ],
+            },
+        ),
+        migrations.RunPython(backfill_trend_rollups, migrations.RunPython.noop),
+    ]
@@ -1,7 +1,266 @@
+from django.contrib.postgres.search import SearchVectorField
 from django.db import models
 from django.urls import reverse
 from django.utils import timezone
 import json
+import re
+
+
+# Competition dates appear as '202309', '2023-09' or just '2023'
+COMPETITION_DATE_RE = re.compile(r'^\s*(\d{4})(?:\D?(\d{1,2}))?')
+
+
+def parse_funding_amount(amount_str):
+    """Parse funding amount text - handles complex cases like semicolon-separated values"""
+    if not amount_str or amount_str.upper() in ['N/A', 'NULL', '']:
+        return None
+    
+    try:
+        # Clean the string
+        cleaned = str(amount_str).replace('$', '').replace(',', '').replace('"', '').strip()
+        
+        # Handle semicolon-separated values by taking the first one
+        if ';' in cleaned:
+            cleaned = cleaned.split(';')[0].strip()
+        
+        # Convert to float
+        return float(cleaned) if cleaned else None
+    except (ValueError, TypeError):
+        return None
+
+
+def parse_competition_year(value):
+    """Extract the integer year from competition_year_month"""
+    match = COMPETITION_DATE_RE.match(value or '')
+    return int(match.group(1)) if match else None
+
+
+def parse_competition_month(value):
+    """Extract the integer month (1-12) from competition_year_month"""
+    match = COMPETITION_DATE_RE.match(value or '')
+    if not match or not match.group(2):
+        return None
+    month = int(match.group(2))
+    return month if 1 <= month <= 12 else None
+
+
+# Yes/no classification flags packed into CIHRProject.flags; a flag's bit is
+# its position in this list, so new flags must only ever be appended
+FLAG_FIELDS = [
+    # Data and Methodology
+    'replication_study',
+
+    # Population Characteristics
+    'vulnerable_populations',
+    'rare_disease',
+
+    # Intervention Details
+    'dose_response',
+    'combination_therapy',
+    'personalized_medicine',
+
+    # Outcomes
+    'safety_focus',
+    'quality_of_life',
+    'biomarker_endpoints',
+    'time_to_event',
+    'composite_endpoint',
+
+    # Technology and Innovation
+    'ai_machine_learning',
+    'digital_health',
+    'telemedicine',
+    'wearable_technology',
+    'big_data_analytics',
+    'blockchain',
+
+    # Health Economics
+    'cost_effectiveness',
+    'budget_impact',
+    'health_technology_assessment',
+    'resource_utilization',
+    'productivity_outcomes',
+
+    # Implementation and Translation
+    'implementation_science',
+    'policy_evaluation',
+    'health_system_integration',
+    'scalability_assessment',
+    'barrier_identification',
+
+    # Statistical and Analytical Methods
+    'adaptive_design',
+    'bayesian_methods',
+    'machine_learning_analysis',
+    'novel_biostatistics',
+
+    # Evidence and Engagement
+    'patient_reported_outcomes',
+    'real_world_evidence',
+    'industry_partnership',
+    'patient_engagement',
+    'community_based',
+
+    # Collaboration and Ethics
+    'indigenous_collaboration',
+    'international_collaboration',
+    'international_network',
+    'regulatory_pathway',
+    'ethics_focus',
+    'consent_innovation',
+    'data_sharing',
+
+    # Clinical and Research Context
+    'comorbidity_focus',
+    'pandemic_related',
+    'environmental_health',
+    'social_determinants',
+    'health_equity',
+    'climate_health',
+
+    # Study Design and Conduct
+    'biobank_use',
+    'registry_linkage',
+    'cohort_establishment',
+    'platform_trial',
+    'multicenter',
+
+    # Additional Classification
+    'knowledge_translation_focus',
+    'equity_considerations',
+]
+
+FLAG_MASKS = {name: 1 << bit for bit, name in enumerate(FLAG_FIELDS)}
+
+# Columns that actually store the flag attributes
+FLAG_STORAGE_FIELDS = ('flags', 'flag_exceptions')
+
+# Display names of the flags listed by get_yes_fields(), in display order
+YES_FIELD_LABELS = {
+    # Technology and Innovation
+    'ai_machine_learning': 'AI/Machine Learning',
+    'digital_health': 'Digital Health',
+    'telemedicine': 'Telemedicine',
+    'wearable_technology': 'Wearable Technology',
+    'big_data_analytics': 'Big Data Analytics',
+    'blockchain': 'Blockchain',
+
+    # Health Economics
+    'cost_effectiveness': 'Cost Effectiveness',
+    'budget_impact': 'Budget Impact',
+    'health_technology_assessment': 'Health Technology Assessment',
+    'resource_utilization': 'Resource Utilization',
+    'productivity_outcomes': 'Productivity Outcomes',
+
+    # Implementation and Translation
+    'implementation_science': 'Implementation Science',
+    'policy_evaluation': 'Policy Evaluation',
+    'health_system_integration': 'Health System Integration',
+    'scalability_assessment': 'Scalability Assessment',
+    'barrier_identification': 'Barrier Identification',
+
+    # Statistical and Analytical Methods
+    'adaptive_design': 'Adaptive Design',
+    'bayesian_methods': 'Bayesian Methods',
+    'machine_learning_analysis': 'Machine Learning Analysis',
+    'novel_biostatistics': 'Novel Biostatistics',
+
+    # Evidence and Engagement
+    'patient_reported_outcomes': 'Patient Reported Outcomes',
+    'real_world_evidence': 'Real World Evidence',
+    'industry_partnership': 'Industry Partnership',
+    'patient_engagement': 'Patient Engagement',
+    'community_based': 'Community Based',
+
+    # Collaboration and Ethics
+    'indigenous_collaboration': 'Indigenous Collaboration',
+    'international_collaboration': 'International Collaboration',
+    'international_network': 'International Network',
+    'regulatory_pathway': 'Regulatory Pathway',
+    'ethics_focus': 'Ethics Focus',
+    'consent_innovation': 'Consent Innovation',
+    'data_sharing': 'Data Sharing',
+
+    # Clinical and Research Context
+    'comorbidity_focus': 'Comorbidity Focus',
+    'pandemic_related': 'Pandemic Related',
+    'environmental_health': 'Environmental Health',
+    'social_determinants': 'Social Determinants',
+    'health_equity': 'Health Equity',
+    'climate_health': 'Climate Health',
+
+    # Study Design and Conduct
+    'biobank_use': 'Biobank Use',
+    'registry_linkage': 'Registry Linkage',
+    'cohort_establishment': 'Cohort Establishment',
+    'platform_trial': 'Platform Trial',
+    'multicenter': 'Multicenter',
+    'knowledge_translation_focus': 'Knowledge Translation Focus',
+    'equity_considerations': 'Equity Considerations',
+
+    # Outcomes
+    'safety_focus': 'Safety Focus',
+    'quality_of_life': 'Quality of Life',
+    'biomarker_endpoints': 'Biomarker Endpoints',
+    'time_to_event': 'Time to Event',
+    'composite_endpoint': 'Composite Endpoint',
+
+    # Population and Design
+    'vulnerable_populations': 'Vulnerable Populations',
+    'rare_disease': 'Rare Disease',
+    'dose_response': 'Dose Response',
+    'combination_therapy': 'Combination Therapy',
+    'personalized_medicine': 'Personalized Medicine',
+}
+
+
+class FlagSetField(models.BigIntegerField):
+    """Integer bitmask column supporting the flags__hasbits=<mask> lookup"""
+
+    def deconstruct(self):
+        # Migrations record a plain BigIntegerField, so they never import this module
+        name, path, args, kwargs = super().deconstruct()
+        return name, 'django.db.models.BigIntegerField', args, kwargs
+
+
+@FlagSetField.register_lookup
+class HasBits(models.Lookup):
+    """Match rows where every bit of the mask is set: (flags & mask) = mask"""
+    lookup_name = 'hasbits'
+
+    def as_sql(self, compiler, connection):
+        lhs, lhs_params = self.process_lhs(compiler, connection)
+        rhs, rhs_params = self.process_rhs(compiler, connection)
+        return f'({lhs} & {rhs}) = {rhs}', [*lhs_params, *rhs_params, *rhs_params]
+
+
+def flag_q(name):
+    """Q object matching projects whose flag is 'yes'"""
+    return models.Q(flags__hasbits=FLAG_MASKS[name])
+
+
+def flag_property(name):
+    """'yes'/'no' attribute backed by a bit in flags (other values go to flag_exceptions)"""
+    mask = FLAG_MASKS[name]
+
+    def getter(self):
+        exception = self.flag_exceptions.get(name)
+        if exception is not None:
+            return exception
+        return 'yes' if self.flags & mask else 'no'
+
+    def setter(self, value):
+        value = 'no' if value is None else str(value)
+        if value == 'yes':
+            self.flags |= mask
+        else:
+            self.flags &= ~mask
+        if value in ('yes', 'no'):
+            self.flag_exceptions.pop(name, None)
+        else:
+            self.flag_exceptions[name] = value
+
+    return property(getter, setter)
 
 
 class CIHRProject(models.Model):
@@ -24,6 +283,8 @@ class CIHRProject(models.Model):
     # Funding information
     program = models.CharField(max_length=300, blank=True, null=True, help_text="CIHR program")
     competition_year_month = models.CharField(max_length=50, blank=True, null=True, help_text="Competition year/month")
+    competition_year = models.PositiveSmallIntegerField(blank=True, null=True, help_text="Parsed competition year")
+    competition_month = models.PositiveSmallIntegerField(blank=True, null=True, help_text="Parsed competition month")
     peer_review_committee = models.CharField(max_length=300, blank=True, null=True, help_text="Peer review committee")
     primary_institute = models.CharField(max_length=300, blank=True, null=True, help_text="Primary CIHR institute")
     primary_theme = models.CharField(max_length=300, blank=True, null=True, help_text="Primary research theme")
@@ -39,6 +300,10 @@ class CIHRProject(models.Model):
     external_funding_partners = models.TextField(blank=True, null=True, help_text="External funding partners")
     external_funding_amounts = models.CharField(max_length=100, blank=True, null=True, help_text="External funding amounts")
     
+    # Parsed numeric funding (derived from cihr_amounts / cihr_equipment on save and import)
+    funding_amount = models.FloatField(blank=True, null=True, help_text="Parsed CIHR funding amount")
+    equipment_amount = models.FloatField(blank=True, null=True, help_text="Parsed CIHR equipment funding")
+    
     # Study Design Classification (from JSON analysis)
     broad_study_type = models.CharField(max_length=50, default="unclear", 
                                        choices=[
@@ -63,102 +328,43 @@ class CIHRProject(models.Model):
                                 ])
     ipd_used = models.CharField(max_length=50, default="unclear")
     novelty_statement = models.TextField(blank=True, null=True)
-    replication_study = models.CharField(max_length=20, default="no")
     
     # Population Characteristics
     target_population_size = models.CharField(max_length=50, blank=True, null=True)
     age_range = models.CharField(max_length=50, default="unclear")
     gender_focus = models.CharField(max_length=20, default="unclear")
-    vulnerable_populations = models.CharField(max_length=20, default="no")
-    rare_disease = models.CharField(max_length=20, default="no")
     population_description = models.TextField(blank=True, null=True)
     
     # Intervention Details
     intervention_category = models.CharField(max_length=50, blank=True, null=True)
     intervention_name = models.CharField(max_length=200, blank=True, null=True)
     control_type = models.CharField(max_length=100, blank=True, null=True)
-    dose_response = models.CharField(max_length=20, default="no")
-    combination_therapy = models.CharField(max_length=20, default="no")
-    personalized_medicine = models.CharField(max_length=20, default="no")
     
     # Outcomes
     primary_outcome = models.TextField(blank=True, null=True)
     primary_outcome_type = models.CharField(max_length=50, default="unclear")
-    safety_focus = models.CharField(max_length=20, default="no")
-    quality_of_life = models.CharField(max_length=20, default="no")
-    biomarker_endpoints = models.CharField(max_length=20, default="no")
-    time_to_event = models.CharField(max_length=20, default="no")
-    composite_endpoint = models.CharField(max_length=20, default="no")
-    
-    # Technology and Innovation
-    ai_machine_learning = models.CharField(max_length=20, default="no")
-    digital_health = models.CharField(max_length=20, default="no")
-    telemedicine = models.CharField(max_length=20, default="no")
-    wearable_technology = models.CharField(max_length=20, default="no")
-    big_data_analytics = models.CharField(max_length=20, default="no")
-    blockchain = models.CharField(max_length=20, default="no")
-    
-    # Health Economics
-    cost_effectiveness = models.CharField(max_length=20, default="no")
-    budget_impact = models.CharField(max_length=20, default="no")
-    health_technology_assessment = models.CharField(max_length=20, default="no")
-    resource_utilization = models.CharField(max_length=20, default="no")
-    productivity_outcomes = models.CharField(max_length=20, default="no")
-    
-    # Implementation and Translation
-    implementation_science = models.CharField(max_length=20, default="no")
-    policy_evaluation = models.CharField(max_length=20, default="no")
-    health_system_integration = models.CharField(max_length=20, default="no")
-    scalability_assessment = models.CharField(max_length=20, default="no")
-    barrier_identification = models.CharField(max_length=20, default="no")
-    
-    # Statistical and Analytical Methods
-    adaptive_design = models.CharField(max_length=20, default="no")
-    bayesian_methods = models.CharField(max_length=20, default="no")
-    machine_learning_analysis = models.CharField(max_length=20, default="no")
-    novel_biostatistics = models.CharField(max_length=20, default="no")
-    
-    # Evidence and Engagement
-    patient_reported_outcomes = models.CharField(max_length=20, default="no")
-    real_world_evidence = models.CharField(max_length=20, default="no")
-    industry_partnership = models.CharField(max_length=20, default="no")
-    patient_engagement = models.CharField(max_length=20, default="no")
-    community_based = models.CharField(max_length=20, default="no")
-    
-    # Collaboration and Ethics
-    indigenous_collaboration = models.CharField(max_length=20, default="no")
-    international_collaboration = models.CharField(max_length=20, default="no")
-    international_network = models.CharField(max_length=20, default="no")
-    regulatory_pathway = models.CharField(max_length=20, default="no")
-    ethics_focus = models.CharField(max_length=20, default="no")
-    consent_innovation = models.CharField(max_length=20, default="no")
-    data_sharing = models.CharField(max_length=20, default="no")
     
     # Clinical and Research Context
     therapeutic_area = models.CharField(max_length=100, blank=True, null=True)
     disease_stage = models.CharField(max_length=50, default="unclear")
-    comorbidity_focus = models.CharField(max_length=20, default="no")
-    pandemic_related = models.CharField(max_length=20, default="no")
-    environmental_health = models.CharField(max_length=20, default="no")
-    social_determinants = models.CharField(max_length=20, default="no")
-    health_equity = models.CharField(max_length=20, default="no")
-    climate_health = models.CharField(max_length=20, default="no")
     
     # Study Design and Conduct
     urban_rural = models.CharField(max_length=20, default="unclear")
-    biobank_use = models.CharField(max_length=20, default="no")
-    registry_linkage = models.CharField(max_length=20, default="no")
-    cohort_establishment = models.CharField(max_length=20, default="no")
-    platform_trial = models.CharField(max_length=20, default="no")
     study_duration = models.CharField(max_length=20, default="unclear")
-    multicenter = models.CharField(max_length=20, default="no")
     healthcare_setting = models.CharField(max_length=50, default="unclear")
     
     # Additional Classification
     disease_area = models.TextField(blank=True, null=True)
     methodology_innovation = models.TextField(blank=True, null=True)
-    knowledge_translation_focus = models.CharField(max_length=20, default="no")
-    equity_considerations = models.CharField(max_length=20, default="no")
+    
+    # Yes/no classification flags, one bit per flag in FLAG_FIELDS order.
+    # The rare values that are neither 'yes' nor 'no' ('N/A', 'unclear') are
+    # kept in flag_exceptions; each flag is exposed as a 'yes'/'no' attribute.
+    flags = FlagSetField(default=0, help_text="Bitmask of classification flags set to 'yes'")
+    flag_exceptions = models.JSONField(default=dict, blank=True, help_text="Flag values other than yes/no")
+    
+    # Weighted full-text search document (PostgreSQL only, see tracker.search)
+    search_vector = SearchVectorField(blank=True, null=True, editable=False)
     
     # Timestamps
     created_at = models.DateTimeField(auto_now_add=True)
@@ -183,6 +389,10 @@ class CIHRProject(models.Model):
             
             # Indexes for funding analysis
             models.Index(fields=['cihr_amounts']),
+            models.Index(fields=['funding_amount']),
+            # Covering indexes for the grouped institution and institute rankings
+            models.Index(fields=['research_institution', 'funding_amount']),
+            models.Index(fields=['primary_institute', 'funding_amount']),
             
             # Search optimization indexes
             models.Index(fields=['project_title']),
@@ -190,8 +400,47 @@ class CIHRProject(models.Model):
             
             # Date/year based queries
             models.Index(fields=['competition_year_month', 'broad_study_type']),
+            models.Index(fields=['competition_year']),
+            models.Index(fields=['competition_year', 'broad_study_type']),
         ]
     
+    # Columns computed from source text fields: derived field -> (source field, parser)
+    DERIVED_FIELDS = {
+        'funding_amount': ('cihr_amounts', parse_funding_amount),
+        'equipment_amount': ('cihr_equipment', parse_funding_amount),
+        'competition_year': ('competition_year_month', parse_competition_year),
+        'competition_month': ('competition_year_month', parse_competition_month),
+    }
+    
+    @classmethod
+    def derive_values(cls, values):
+        """Compute derived column values for the source fields present in values"""
+        return {
+            derived: parser(values[source])
+            for derived, (source, parser) in cls.DERIVED_FIELDS.items()
+            if source in values
+        }
+    
+    @classmethod
+    def storage_fields(cls, names):
+        """Map attribute names to the concrete columns that store them"""
+        fields = set(names)
+        if fields & FLAG_MASKS.keys():
+            fields = (fields - FLAG_MASKS.keys()) | set(FLAG_STORAGE_FIELDS)
+        return fields
+    
+    def save(self, *args, **kwargs):
+        # Keep derived columns in sync with their source fields
+        for derived, (source, parser) in self.DERIVED_FIELDS.items():
+            setattr(self, derived, parser(getattr(self, source)))
+        
+        update_fields = kwargs.get('update_fields')
+        if update_fields is not None:
+            kwargs['update_fields'] = self.storage_fields(update_fields) | {
+                derived for derived, (source, _) in self.DERIVED_FIELDS.items() if source in update_fields
+            }
+        super().save(*args, **kwargs)
+    
     def __str__(self):
         return f"{self.project_id}: {self.project_title[:100]}..." if len(self.project_title) > 100 else f"{self.project_id}: {self.project_title}"
     
@@ -201,87 +450,10 @@ class CIHRProject(models.Model):
     def get_yes_fields(self):
         """Return only fields with 'yes' values for the detail view"""
         yes_fields = {}
-        field_mapping = {
-            # Technology and Innovation
-            'ai_machine_learning': 'AI/Machine Learning',
-            'digital_health': 'Digital Health',
-            'telemedicine': 'Telemedicine',
-            'wearable_technology': 'Wearable Technology',
-            'big_data_analytics': 'Big Data Analytics',
-            'blockchain': 'Blockchain',
-            
-            # Health Economics
-            'cost_effectiveness': 'Cost Effectiveness',
-            'budget_impact': 'Budget Impact',
-            'health_technology_assessment': 'Health Technology Assessment',
-            'resource_utilization': 'Resource Utilization',
-            'productivity_outcomes': 'Productivity Outcomes',
-            
-            # Implementation and Translation
-            'implementation_science': 'Implementation Science',
-            'policy_evaluation': 'Policy Evaluation',
-            'health_system_integration': 'Health System Integration',
-            'scalability_assessment': 'Scalability Assessment',
-            'barrier_identification': 'Barrier Identification',
-            
-            # Statistical and Analytical Methods
-            'adaptive_design': 'Adaptive Design',
-            'bayesian_methods': 'Bayesian Methods',
-            'machine_learning_analysis': 'Machine Learning Analysis',
-            'novel_biostatistics': 'Novel Biostatistics',
-            
-            # Evidence and Engagement
-            'patient_reported_outcomes': 'Patient Reported Outcomes',
-            'real_world_evidence': 'Real World Evidence',
-            'industry_partnership': 'Industry Partnership',
-            'patient_engagement': 'Patient Engagement',
-            'community_based': 'Community Based',
-            
-            # Collaboration and Ethics
-            'indigenous_collaboration': 'Indigenous Collaboration',
-            'international_collaboration': 'International Collaboration',
-            'international_network': 'International Network',
-            'regulatory_pathway': 'Regulatory Pathway',
-            'ethics_focus': 'Ethics Focus',
-            'consent_innovation': 'Consent Innovation',
-            'data_sharing': 'Data Sharing',
-            
-            # Clinical and Research Context
-            'comorbidity_focus': 'Comorbidity Focus',
-            'pandemic_related': 'Pandemic Related',
-            'environmental_health': 'Environmental Health',
-            'social_determinants': 'Social Determinants',
-            'health_equity': 'Health Equity',
-            'climate_health': 'Climate Health',
-            
-            # Study Design and Conduct
-            'biobank_use': 'Biobank Use',
-            'registry_linkage': 'Registry Linkage',
-            'cohort_establishment': 'Cohort Establishment',
-            'platform_trial': 'Platform Trial',
-            'multicenter': 'Multicenter',
-            'knowledge_translation_focus': 'Knowledge Translation Focus',
-            'equity_considerations': 'Equity Considerations',
-            
-            # Outcomes
-            'safety_focus': 'Safety Focus',
-            'quality_of_life': 'Quality of Life',
-            'biomarker_endpoints': 'Biomarker Endpoints',
-            'time_to_event': 'Time to Event',
-            'composite_endpoint': 'Composite Endpoint',
-            
-            # Population and Design
-            'vulnerable_populations': 'Vulnerable Populations',
-            'rare_disease': 'Rare Disease',
-            'dose_response': 'Dose Response',
-            'combination_therapy': 'Combination Therapy',
-            'personalized_medicine': 'Personalized Medicine',
-        }
         
-        for field_name, display_name in field_mapping.items():
-            field_value = getattr(self, field_name, None)
-            if field_value == 'yes':
-                yes_fields[display_name] = field_value
+        for field_name, display_name in YES_FIELD_LABELS.items():
+            if self.flags & FLAG_MASKS[field_name] and field_name not in self.flag_exceptions:
+                yes_fields[display_name] = 'yes'
                 
         return yes_fields
     
@@ -291,10 +463,66 @@ class CIHRProject(models.Model):
         if self.cihr_amounts:
             return self.cihr_amounts.replace('"', '').replace('$', '').replace(',', '')
         return None
+
+
+for _name in FLAG_FIELDS:
+    setattr(CIHRProject, _name, flag_property(_name))
+
+
+class ImportManifest(models.Model):
+    """Fingerprint of an imported JSON file or CSV row, used to skip unchanged inputs"""
     
-    @property
-    def competition_year(self):
-        """Extract year from competition_year_month"""
-        if self.competition_year_month:
-            return self.competition_year_month[:4]
-        return None
+    SOURCE_CHOICES = [
+        ('json', 'JSON file'),
+        ('csv', 'CSV row'),
+    ]
+    
+    source = models.CharField(max_length=10, choices=SOURCE_CHOICES)
+    key = models.CharField(max_length=255, help_text="JSON filename or CSV project_id")
+    mtime = models.FloatField(blank=True, null=True, help_text="File modification time when imported")
+    size = models.BigIntegerField(blank=True, null=True, help_text="File size in bytes when imported")
+    content_hash = models.CharField(max_length=64, help_text="SHA-256 of the imported content")
+    updated_at = models.DateTimeField(auto_now=True)
+    
+    class Meta:
+        db_table = 'cihr_import_manifest'
+        constraints = [
+            models.UniqueConstraint(fields=['source', 'key'], name='unique_import_manifest_entry'),
+        ]
+    
+    def __str__(self):
+        return f"{self.source}:{self.key}"
+
+
+class StatisticsSnapshot(models.Model):
+    """Precomputed statistics payload, rebuilt at the end of each import"""
+    
+    key = models.CharField(max_length=50, unique=True, help_text="Statistics name, e.g. 'home' or 'statistics'")
+    payload = models.TextField(help_text="JSON-encoded statistics (stored as text to keep key order)")
+    updated_at = models.DateTimeField(auto_now=True)
+    
+    class Meta:
+        db_table = 'cihr_statistics_snapshot'
+    
+    def __str__(self):
+        return self.key
+
+
+class TrendRollup(models.Model):
+    """Project count and funding per competition year for one dimension value, kept current by the importers"""
+    
+    year = models.PositiveSmallIntegerField(help_text="Competition year")
+    dimension = models.CharField(max_length=50, help_text="Grouping field, 'all' for yearly totals or 'flag'")
+    value = models.CharField(max_length=300, blank=True, help_text="Field value, or flag name for 'flag'")
+    project_count = models.PositiveIntegerField(default=0)
+    funded_count = models.PositiveIntegerField(default=0, help_text="Projects with a positive funding amount")
+    funding_total = models.FloatField(default=0)
+    
+    class Meta:
+        db_table = 'cihr_trend_rollup'
+        constraints = [
+            models.UniqueConstraint(fields=['dimension', 'value', 'year'], name='unique_trend_rollup_entry'),
+        ]
+    
+    def __str__(self):
+        return f"{self.dimension}:{self.value}:{self.year}"
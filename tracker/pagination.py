@@ -0,0 +1,51 @@
+"""Pagination for the project list and the REST API"""
+from rest_framework.pagination import CursorPagination, PageNumberPagination
+
+
+class ProjectCursorPagination(CursorPagination):
+    """Keyset pagination: each page is a range scan from the cursor position, with no COUNT"""
+    ordering = '-project_id'
+
+    # Explicit opt-in for the first page of a keyset crawl (?pagination=cursor)
+    mode_query_param = 'pagination'
+    mode_query_value = 'cursor'
+
+    def is_requested(self, request):
+        return (
+            self.cursor_query_param in request.query_params
+            or request.query_params.get(self.mode_query_param) == self.mode_query_value
+        )
+
+
+class ProjectPagination(PageNumberPagination):
+    """Page-number pagination, switching to ProjectCursorPagination when the client opts in.
+
+    Cursor pages are ordered by the ?ordering parameter (default -project_id);
+    relevance ranking of searches does not apply to them.
+    """
+
+    def paginate_queryset(self, queryset, request, view=None):
+        cursor_pagination = ProjectCursorPagination()
+        self.cursor_pagination = cursor_pagination if cursor_pagination.is_requested(request) else None
+        if self.cursor_pagination is None:
+            return super().paginate_queryset(queryset, request, view)
+
+        page = self.cursor_pagination.paginate_queryset(queryset, request, view)
+        self.display_page_controls = self.cursor_pagination.display_page_controls
+        return page
+
+    def get_paginated_response(self, data):
+        if self.cursor_pagination is not None:
+            return self.cursor_pagination.get_paginated_response(data)
+        return super().get_paginated_response(data)
+
+    def to_html(self):
+        if self.cursor_pagination is not None:
+            return self.cursor_pagination.to_html()
+        return super().to_html()
+
+    def get_schema_operation_parameters(self, view):
+        return [
+            *super().get_schema_operation_parameters(view),
+            *ProjectCursorPagination().get_schema_operation_parameters(view),
+        ]
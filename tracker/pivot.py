@@ -0,0 +1,165 @@
+"""Ad-hoc pivot tables over the columnar snapshot, served by /api/pivot/"""
+import hashlib
+import json
+
+import numpy as np
+
+from .cache_utils import get_or_compute, versioned_key
+from .columnar import CATEGORY_FIELDS, columns
+from .models import FLAG_FIELDS
+
+
+# Measures: count of projects, funding sum/average over funded projects, share of projects with a flag
+MEASURES = ['count', 'sum_funding', 'avg_funding', 'flag_share']
+
+# Rows beyond the limit are dropped (largest rows by project count are kept)
+DEFAULT_ROW_LIMIT = 100
+MAX_ROWS = 500
+
+# A second dimension with more values than this is rejected
+MAX_COLUMNS = 100
+
+
+class PivotError(ValueError):
+    """Invalid pivot query; the message is returned to the client"""
+
+
+def parse_pivot_query(params):
+    """Normalized pivot query from request parameters, raising PivotError when invalid"""
+    rows = params.get('rows', '')
+    if rows not in CATEGORY_FIELDS:
+        raise PivotError(f'rows must be one of: {", ".join(CATEGORY_FIELDS)}')
+
+    column = params.get('columns') or None
+    if column is not None and (column not in CATEGORY_FIELDS or column == rows):
+        raise PivotError(f'columns must be another of: {", ".join(CATEGORY_FIELDS)}')
+
+    measure = params.get('measure') or 'count'
+    if measure not in MEASURES:
+        raise PivotError(f'measure must be one of: {", ".join(MEASURES)}')
+
+    flag = params.get('flag') or None
+    if measure == 'flag_share' and flag not in FLAG_FIELDS:
+        raise PivotError('flag_share needs flag=<classification field>')
+    if measure != 'flag_share':
+        flag = None
+
+    try:
+        limit = int(params.get('limit') or DEFAULT_ROW_LIMIT)
+    except ValueError:
+        raise PivotError('limit must be an integer')
+    if not 1 <= limit <= MAX_ROWS:
+        raise PivotError(f'limit must be between 1 and {MAX_ROWS}')
+
+    # Filters: exact dimension values and flags answered 'yes'
+    filters = {field: params[field] for field in CATEGORY_FIELDS if params.get(field)}
+    for name in FLAG_FIELDS:
+        value = params.get(name)
+        if value:
+            if value.lower() != 'yes':
+                raise PivotError(f'{name} can only be filtered on yes')
+            filters[name] = 'yes'
+
+    return {
+        'rows': rows,
+        'columns': column,
+        'measure': measure,
+        'flag': flag,
+        'limit': limit,
+        'filters': filters,
+    }
+
+
+def pivot_cache_key(query):
+    digest = hashlib.sha256(json.dumps(query, sort_keys=True).encode('utf-8')).hexdigest()
+    return versioned_key('pivot', digest)
+
+
+def _filter_mask(snapshot, filters):
+    mask = np.ones(snapshot.size, dtype=bool)
+    for field, value in filters.items():
+        if field in snapshot.flag_index:
+            mask &= snapshot.flag(field)
+            continue
+        categories = snapshot.categories[field]
+        codes = [code for code, category in enumerate(categories) if str(category) == value]
+        mask &= np.isin(snapshot.codes[field], codes)
+    return mask
+
+
+def _measure(snapshot, query, counts, aggregate):
+    """Measure values shaped like counts, from aggregate(weights) over the same cells"""
+    measure = query['measure']
+    if measure == 'count':
+        return counts.astype(float)
+    if measure == 'sum_funding':
+        return aggregate(snapshot.funding_filled)
+    if measure == 'avg_funding':
+        totals = aggregate(snapshot.funding_filled)
+        funded = aggregate(snapshot.funded.astype(float))
+        return np.divide(totals, funded, out=np.full(totals.shape, np.nan), where=funded > 0)
+    flagged = aggregate(snapshot.flag(query['flag']).astype(float))
+    return np.divide(flagged, counts, out=np.full(flagged.shape, np.nan), where=counts > 0)
+
+
+def _json_values(values):
+    """Plain floats (counts as ints) with None for empty cells"""
+    return [None if np.isnan(value) else (int(value) if value.is_integer() else round(value, 4)) for value in values]
+
+
+def run_pivot(query):
+    """Pivot payload for a parsed query, cached per normalized query until the next import"""
+    return get_or_compute(pivot_cache_key(query), lambda: compute_pivot(query))
+
+
+def compute_pivot(query):
+    snapshot = columns()
+    mask = _filter_mask(snapshot, query['filters'])
+    rows, column = query['rows'], query['columns']
+
+    if column is None:
+        counts_by_value = snapshot.group(rows, mask=mask)
+        row_values = list(counts_by_value)
+        counts = np.array([counts_by_value[value] for value in row_values], dtype=float)
+
+        def aggregate(weights):
+            totals = snapshot.group(rows, weights=weights, mask=mask)
+            return np.array([totals[value] for value in row_values], dtype=float)
+
+        column_values = None
+        row_counts = counts
+    else:
+        row_values, column_values, counts = snapshot.crosstab(rows, column, mask=mask)
+        if len(column_values) > MAX_COLUMNS:
+            raise PivotError(
+                f'{column} has {len(column_values)} values (max {MAX_COLUMNS}); add filters or swap rows and columns'
+            )
+
+        # Columns in their natural order (e.g. years ascending)
+        column_order = sorted(range(len(column_values)), key=lambda j: column_values[j])
+        column_values = [column_values[j] for j in column_order]
+        counts = counts[:, column_order]
+
+        def aggregate(weights):
+            return snapshot.crosstab(rows, column, weights=weights, mask=mask)[2][:, column_order]
+
+        row_counts = counts.sum(axis=1)
+
+    values = _measure(snapshot, query, counts, aggregate)
+
+    # Keep the largest rows by project count, in that order
+    order = sorted(range(len(row_values)), key=lambda i: (-row_counts[i], str(row_values[i])))
+    total_rows = len(order)
+    order = order[:query['limit']]
+
+    return {
+        **query,
+        'total_rows': total_rows,
+        'truncated': total_rows > len(order),
+        'row_values': [row_values[i] for i in order],
+        'column_values': column_values,
+        'values': [
+            _json_values(values[i]) if column is not None else _json_values([values[i]])[0]
+            for i in order
+        ],
+    }
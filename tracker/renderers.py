@@ -0,0 +1,35 @@
+"""JSON rendering for the REST API through orjson when it is installed"""
+from rest_framework.renderers import JSONRenderer
+from rest_framework.settings import api_settings
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+
+class FastJSONRenderer(JSONRenderer):
+    """JSONRenderer producing the same compact UTF-8 output with orjson.
+
+    Falls back to the stock renderer without orjson, for indented output
+    (?indent= or an Accept parameter), and when the COMPACT_JSON or
+    UNICODE_JSON settings are turned off. Datetimes and types orjson does not
+    know go through DRF's encoder so they render exactly as before.
+    """
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if (
+            orjson is None
+            or data is None
+            or not (api_settings.COMPACT_JSON and api_settings.UNICODE_JSON)
+            or self.get_indent(accepted_media_type, renderer_context or {})
+        ):
+            return super().render(data, accepted_media_type, renderer_context)
+
+        ret = orjson.dumps(
+            data,
+            default=self.encoder_class().default,
+            option=orjson.OPT_NON_STR_KEYS | orjson.OPT_PASSTHROUGH_DATETIME,
+        )
+        # Escaped by the stock renderer too, since they are not valid in JavaScript strings
+        return ret.replace(b'\xe2\x80\xa8', b'\\u2028').replace(b'\xe2\x80\xa9', b'\\u2029')
@@ -0,0 +1,89 @@
+"""Project search: PostgreSQL full-text search with an icontains fallback for SQLite"""
+from django.contrib.postgres.search import SearchQuery, SearchRank, SearchVector
+from django.db import connections
+from django.db.models import F, Q
+from rest_framework import filters
+from rest_framework.settings import api_settings
+
+from .models import CIHRProject
+
+
+# Text search configuration used to build and query search_vector
+SEARCH_CONFIG = 'english'
+
+# Fields searched by project_list and the API, with their tsvector weights
+SEARCH_FIELD_WEIGHTS = {
+    'project_title': 'A',
+    'keywords': 'B',
+    'principal_investigators': 'B',
+    'abstract_summary': 'C',
+}
+SEARCH_FIELDS = list(SEARCH_FIELD_WEIGHTS)
+
+
+def search_vector_expression():
+    """Weighted tsvector over SEARCH_FIELD_WEIGHTS, stored in CIHRProject.search_vector"""
+    vectors = [
+        SearchVector(field, weight=weight, config=SEARCH_CONFIG)
+        for field, weight in SEARCH_FIELD_WEIGHTS.items()
+    ]
+    vector = vectors[0]
+    for other in vectors[1:]:
+        vector = vector + other
+    return vector
+
+
+def full_text_enabled(using='default'):
+    """True when the database supports the tsvector search column"""
+    return connections[using].vendor == 'postgresql'
+
+
+def refresh_search_vectors(queryset=None):
+    """Recompute search_vector for the given projects (all projects by default)"""
+    queryset = CIHRProject.objects.all() if queryset is None else queryset
+    if not full_text_enabled(queryset.db):
+        return 0
+    return queryset.update(search_vector=search_vector_expression())
+
+
+def search_projects(queryset, query, fields=SEARCH_FIELDS, rank=True):
+    """Filter projects matching query, ordered by relevance when full-text search is available.
+
+    On SQLite this falls back to OR-ed icontains lookups over fields, in the
+    queryset's existing order.
+    """
+    if not query:
+        return queryset
+
+    if full_text_enabled(queryset.db):
+        search_query = SearchQuery(query, search_type='websearch', config=SEARCH_CONFIG)
+        queryset = queryset.filter(search_vector=search_query)
+        if rank:
+            queryset = queryset.annotate(
+                search_rank=SearchRank(F('search_vector'), search_query)
+            ).order_by('-search_rank', '-project_id')
+        return queryset
+
+    condition = Q()
+    for field in fields:
+        condition |= Q(**{f'{field}__icontains': query})
+    return queryset.filter(condition)
+
+
+class ProjectSearchFilter(filters.SearchFilter):
+    """DRF search backend using the search_vector column on PostgreSQL.
+
+    Results are ranked by relevance unless the request has an explicit
+    ordering parameter; on other databases the stock SearchFilter is used.
+    """
+
+    def filter_queryset(self, request, queryset, view):
+        if not full_text_enabled(queryset.db):
+            return super().filter_queryset(request, queryset, view)
+
+        query = ' '.join(self.get_search_terms(request))
+        if not query:
+            return queryset
+
+        rank = api_settings.ORDERING_PARAM not in request.query_params
+        return search_projects(queryset, query, rank=rank)
@@ -1,5 +1,5 @@
 from rest_framework import serializers
-from .models import CIHRProject
+from .models import CIHRProject, FLAG_FIELDS, FLAG_MASKS, FLAG_STORAGE_FIELDS, YES_FIELD_LABELS
 
 
 class CIHRProjectSerializer(serializers.ModelSerializer):
@@ -11,10 +11,17 @@ class CIHRProjectSerializer(serializers.ModelSerializer):
     
     class Meta:
         model = CIHRProject
-        fields = '__all__'
+        exclude = [*FLAG_STORAGE_FIELDS, 'search_vector']
+        
+    def get_fields(self):
+        # Expose each packed classification flag as its 'yes'/'no' value
+        fields = super().get_fields()
+        for name in FLAG_FIELDS:
+            fields[name] = serializers.CharField(read_only=True)
+        return fields
         
     def get_competition_year(self, obj):
-        return obj.competition_year
+        return str(obj.competition_year) if obj.competition_year else None
         
     def get_funding_amount_display(self, obj):
         return obj.funding_amount_display
@@ -39,7 +46,89 @@ class CIHRProjectListSerializer(serializers.ModelSerializer):
         ]
         
     def get_competition_year(self, obj):
-        return obj.competition_year
+        return str(obj.competition_year) if obj.competition_year else None
         
     def get_funding_amount_display(self, obj):
-        return obj.funding_amount_display 
\ No newline at end of file
+        return obj.funding_amount_display 
+
+class ProjectRowSerializer:
+    """Read-only fast path producing the output of a project serializer from .values() rows.
+
+    The output fields, the columns to fetch and one converter per field are
+    worked out once per (serializer, field set), so each row is a dict built
+    with plain lookups instead of DRF's per-field to_representation() calls.
+    """
+
+    def __init__(self, serializer_class, fields=None):
+        declared = serializer_class().fields
+        names = list(declared)
+        if fields is not None:
+            unknown = sorted(set(fields) - set(names))
+            if unknown:
+                raise serializers.ValidationError({'fields': f'Unknown fields: {", ".join(unknown)}'})
+            names = [name for name in names if name in fields]
+
+        self.names = names
+        self.converters = []
+        columns = set()
+        for name in names:
+            converter, needed = self.converter(name, declared[name])
+            self.converters.append((name, converter))
+            columns.update(needed)
+        self.columns = sorted(columns)
+
+    @staticmethod
+    def converter(name, field):
+        """(row -> value, columns read) for one output field"""
+        if name == 'competition_year':
+            return (lambda row: str(row['competition_year']) if row['competition_year'] else None), ['competition_year']
+        if name == 'funding_amount_display':
+            def funding_amount_display(row):
+                amounts = row['cihr_amounts']
+                return amounts.replace('"', '').replace('$', '').replace(',', '') if amounts else None
+            return funding_amount_display, ['cihr_amounts']
+        if name == 'yes_fields':
+            labels = [(FLAG_MASKS[flag], flag, label) for flag, label in YES_FIELD_LABELS.items()]
+
+            def yes_fields(row):
+                flags, exceptions = row['flags'], row['flag_exceptions']
+                return {label: 'yes' for mask, flag, label in labels if flags & mask and flag not in exceptions}
+            return yes_fields, FLAG_STORAGE_FIELDS
+        if name in FLAG_MASKS:
+            mask = FLAG_MASKS[name]
+
+            def flag_value(row):
+                exception = row['flag_exceptions'].get(name)
+                if exception is not None:
+                    return exception
+                return 'yes' if row['flags'] & mask else 'no'
+            return flag_value, FLAG_STORAGE_FIELDS
+        if isinstance(field, serializers.DateTimeField):
+            to_representation = field.to_representation
+            return (lambda row: None if row[name] is None else to_representation(row[name])), [name]
+        # Char, text, integer and float columns are returned as stored
+        return (lambda row: row[name]), [name]
+
+    def to_representation(self, row):
+        return {name: convert(row) for name, convert in self.converters}
+
+    def many(self, rows):
+        converters = self.converters
+        return [{name: convert(row) for name, convert in converters} for row in rows]
+
+
+# Distinct ?fields= combinations kept; the cache is emptied when it fills up
+ROW_SERIALIZER_CACHE_SIZE = 128
+
+_row_serializers = {}
+
+
+def row_serializer(serializer_class, fields_param=None):
+    """Cached ProjectRowSerializer for a serializer and a ?fields= value (comma-separated)"""
+    fields = frozenset(filter(None, (name.strip() for name in fields_param.split(',')))) if fields_param else None
+    key = (serializer_class, fields)
+    if key not in _row_serializers:
+        if len(_row_serializers) >= ROW_SERIALIZER_CACHE_SIZE:
+            _row_serializers.clear()
+        _row_serializers[key] = ProjectRowSerializer(serializer_class, fields)
+    return _row_serializers[key]
@@ -0,0 +1,171 @@
+"""Precomputed statistics snapshots for the home, statistics and API views"""
+import json
+
+from django.core.serializers.json import DjangoJSONEncoder
+
+from .cache_utils import get_or_compute, versioned_key
+from .columnar import ColumnarSnapshot
+from .models import StatisticsSnapshot
+
+
+def top_counts(columns, field, limit=None):
+    """Project counts per value of field, excluding blank and 'N/A' values"""
+    return [{field: value, 'count': count} for value, count in columns.top(field, limit)]
+
+
+# Focus areas summed in the funding breakdown: snapshot key -> flag
+FOCUS_AREA_FLAGS = {
+    'patient_engagement': 'patient_engagement',
+    'indigenous_collaboration': 'indigenous_collaboration',
+    'international_collaboration': 'international_collaboration',
+    'health_equity': 'health_equity',
+    'implementation_science': 'implementation_science',
+    'knowledge_translation': 'knowledge_translation_focus',
+}
+
+TECH_FLAGS = [
+    'ai_machine_learning', 'digital_health', 'telemedicine',
+    'wearable_technology', 'big_data_analytics', 'blockchain',
+]
+
+
+def compute_funding_stats(columns):
+    """Funding statistics over the parsed funding column of the columnar snapshot"""
+    funded = columns.funded
+    total_funding = columns.funding_filled.sum().item()
+    project_count = int(funded.sum())
+
+    # Group by categories
+    funding_stats = {
+        field: columns.group(field, weights=columns.funding_filled, mask=funded)
+        for field in ['therapeutic_area', 'primary_institute', 'primary_theme', 'broad_study_type']
+    }
+
+    # Special focus areas - one matrix product over the flag columns
+    focus_totals = columns.flag_totals(list(FOCUS_AREA_FLAGS.values()), weights=columns.funding_filled)
+    focus_funding = {area: focus_totals[flag] for area, flag in FOCUS_AREA_FLAGS.items()}
+
+    return {
+        'total_funding': total_funding,
+        'project_count': project_count,
+        'avg_funding': total_funding / project_count if project_count > 0 else 0,
+        'by_category': funding_stats,
+        'focus_areas': focus_funding
+    }
+
+
+def compute_home_stats(columns, funding_stats):
+    """Overview numbers for the home page"""
+    return {
+        'total_projects': columns.size,
+        'total_funding': funding_stats['total_funding'],
+        'funding_projects': funding_stats['project_count'],
+        'therapeutic_areas': top_counts(columns, 'therapeutic_area', 10),
+        'primary_institutes': top_counts(columns, 'primary_institute', 5),
+    }
+
+
+def compute_statistics(columns, funding_stats):
+    """Everything rendered by the statistics page"""
+    # Study type distribution
+    study_types = [
+        {'broad_study_type': value, 'count': count}
+        for value, count in columns.top('broad_study_type', skip_blank=False)
+    ]
+
+    # Year distribution
+    year_distribution = dict(sorted(columns.group('competition_year').items()))
+
+    # Technology adoption and special focus areas - column sums of the flag matrix
+    tech_stats = columns.flag_totals(TECH_FLAGS)
+    focus_counts = columns.flag_totals(list(FOCUS_AREA_FLAGS.values()))
+    focus_areas = {area: focus_counts[flag] for area, flag in FOCUS_AREA_FLAGS.items()}
+
+    # Funding rankings from the shared funding aggregates
+    by_category = funding_stats['by_category']
+
+    def top_funded(field):
+        return sorted(by_category.get(field, {}).items(), key=lambda x: x[1], reverse=True)[:10]
+
+    funding_by_focus = funding_stats['focus_areas']
+
+    return {
+        'total_projects': columns.size,
+        'study_types': study_types,
+        'therapeutic_areas': top_counts(columns, 'therapeutic_area', 15),
+        'institutes': top_counts(columns, 'primary_institute', 10),
+        'themes': top_counts(columns, 'primary_theme', 10),
+        'year_distribution': year_distribution,
+        'tech_stats': tech_stats,
+        'focus_areas': focus_areas,
+        'total_funding': funding_stats['total_funding'] or 0,
+        'funding_projects': funding_stats['project_count'] or 0,
+        'avg_funding': funding_stats['avg_funding'] or 0,
+        'top_funded_areas': top_funded('therapeutic_area'),
+        'top_funded_institutes': top_funded('primary_institute'),
+        'funding_by_study_type': dict(by_category.get('broad_study_type', {})),
+        'top_funded_themes': top_funded('primary_theme'),
+        'funding_by_focus': {
+            'Patient Engagement': funding_by_focus['patient_engagement'],
+            'Indigenous Collaboration': funding_by_focus['indigenous_collaboration'],
+            'International Collaboration': funding_by_focus['international_collaboration'],
+            'Health Equity': funding_by_focus['health_equity'],
+            'Implementation Science': funding_by_focus['implementation_science'],
+            'Knowledge Translation': funding_by_focus['knowledge_translation'],
+        },
+    }
+
+
+def compute_api_statistics(columns):
+    """Summary returned by the API statistics action"""
+    return {
+        'total_projects': columns.size,
+        'study_types': [
+            {'broad_study_type': value, 'count': count}
+            for value, count in columns.top('broad_study_type', skip_blank=False)
+        ],
+        'therapeutic_areas': top_counts(columns, 'therapeutic_area', 10),
+    }
+
+
+def build_snapshots():
+    """Compute every snapshot payload from one columnar read of the project table.
+
+    The snapshot is read fresh rather than taken from columnar.columns(): the
+    importers rebuild snapshots before they bump the data version.
+    """
+    columns = ColumnarSnapshot.from_database()
+    funding_stats = compute_funding_stats(columns)
+    return {
+        'home': compute_home_stats(columns, funding_stats),
+        'statistics': compute_statistics(columns, funding_stats),
+        'api_statistics': compute_api_statistics(columns),
+    }
+
+
+def rebuild_snapshots():
+    """Recompute all statistics and store them; returns the decoded payloads by key"""
+    encoded = {
+        key: json.dumps(payload, cls=DjangoJSONEncoder)
+        for key, payload in build_snapshots().items()
+    }
+    StatisticsSnapshot.objects.bulk_create(
+        [StatisticsSnapshot(key=key, payload=payload) for key, payload in encoded.items()],
+        update_conflicts=True,
+        unique_fields=['key'],
+        update_fields=['payload', 'updated_at'],
+    )
+    return {key: json.loads(payload) for key, payload in encoded.items()}
+
+
+def load_snapshot(key):
+    """Read one statistics payload in a single query, building snapshots on first use"""
+    payload = StatisticsSnapshot.objects.filter(key=key).values_list('payload', flat=True).first()
+    if payload is None:
+        return rebuild_snapshots()[key]
+    return json.loads(payload)
+
+
+def get_snapshot(key):
+    """Statistics payload, held in memory until the next import (treat it as read-only)"""
+    return get_or_compute(versioned_key('statistics_snapshot', key), lambda: load_snapshot(key))
@@ -1,3 +1,487 @@
-from django.test import TestCase
+import csv
+import gzip
+import io
+import json
+import math
+import os
+import shutil
+import tempfile
+import threading
+import time
+from unittest import mock
 
-# Create your tests here.
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.core.management import call_command
+from django.db import connection
+from django.db.migrations.executor import MigrationExecutor
+from django.test import TestCase, TransactionTestCase, override_settings
+
+from . import exports
+from .cache_utils import LocalCache, bump_data_version, data_version, get_or_compute, versioned_key
+from .exports import EXPORT_FIELDS, ExportError, export_filters, export_queryset, stream_export
+from .importers import BulkProjectWriter, iter_csv_rows
+from .models import FLAG_MASKS, CIHRProject, TrendRollup, flag_q
+from .pivot import MAX_ROWS, PivotError, parse_pivot_query
+from .serializers import CIHRProjectSerializer
+from .trends import rebuild_trends
+
+
+def project_values(**values):
+    """CSV and JSON field values for a test project"""
+    return {
+        'project_title': 'Test project',
+        'cihr_amounts': '$1,000',
+        'competition_year_month': '2023-09',
+        'research_institution': 'University of Toronto',
+        'broad_study_type': 'interventional',
+        **values,
+    }
+
+
+def rollup_rows():
+    return {
+        (row.year, row.dimension, row.value, row.project_count, row.funded_count, round(row.funding_total, 2))
+        for row in TrendRollup.objects.all()
+    }
+
+
+class TemporaryExportDirMixin:
+    """Point pre-built exports at a temporary directory, as imports rebuild them"""
+
+    def setUp(self):
+        super().setUp()
+        export_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, export_dir)
+        patcher = mock.patch.object(exports, 'EXPORT_DIR', export_dir)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        bump_data_version()
+
+
+class ProjectAPIRetrieveTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.project = CIHRProject.objects.create(
+            project_id='123456',
+            project_title='Test project',
+            cihr_amounts='$1,000',
+            competition_year_month='2023-09',
+            patient_engagement='yes',
+        )
+
+    def test_detail_matches_serializer(self):
+        response = self.client.get(f'/api/projects/{self.project.pk}/', HTTP_ACCEPT='application/json')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json(), CIHRProjectSerializer(self.project).data)
+
+    def test_missing_pk_is_404(self):
+        response = self.client.get(f'/api/projects/{self.project.pk + 1}/', HTTP_ACCEPT='application/json')
+        self.assertEqual(response.status_code, 404)
+
+    def test_non_numeric_pk_is_404(self):
+        response = self.client.get('/api/projects/abc/', HTTP_ACCEPT='application/json')
+        self.assertEqual(response.status_code, 404)
+
+
+class BulkProjectWriterTests(TestCase):
+    def write(self, rows, **kwargs):
+        writer = BulkProjectWriter(**kwargs)
+        for project_id, values in rows.items():
+            writer.add(project_id, values)
+        writer.flush()
+        return writer
+
+    def test_create_update_unchanged_counts(self):
+        rows = {'1001': project_values(), '1002': project_values(project_title='Second project')}
+        writer = self.write(rows, batch_size=1)
+        self.assertEqual((writer.created, writer.updated, writer.unchanged), (2, 0, 0))
+        self.assertEqual(CIHRProject.objects.get(project_id='1001').funding_amount, 1000.0)
+
+        rows['1002'] = project_values(project_title='Renamed project')
+        writer = self.write(rows)
+        self.assertEqual((writer.created, writer.updated, writer.unchanged), (0, 1, 1))
+        self.assertEqual(writer.rows_written, 1)
+        self.assertEqual(CIHRProject.objects.get(project_id='1002').project_title, 'Renamed project')
+
+    def test_missing_rows_are_not_created_when_disabled(self):
+        writer = self.write({'1003': project_values()}, create_missing=False)
+        self.assertEqual((writer.created, writer.missing), (0, 1))
+        self.assertFalse(CIHRProject.objects.exists())
+
+    def test_trend_rollup_deltas_match_rebuild(self):
+        self.write({
+            '1001': project_values(therapeutic_area='Oncology', patient_engagement='yes'),
+            '1002': project_values(therapeutic_area='Cardiology', cihr_amounts=''),
+            '1003': project_values(competition_year_month='2021-03'),
+        })
+        self.write({
+            '1001': project_values(therapeutic_area='Cardiology', cihr_amounts='$5,000', patient_engagement='no'),
+            '1003': project_values(competition_year_month='2022-03', telemedicine='yes'),
+        })
+
+        incremental = rollup_rows()
+        rebuild_trends()
+        self.assertEqual(incremental, rollup_rows())
+        self.assertIn((2023, 'therapeutic_area', 'Cardiology', 2, 1, 5000.0), incremental)
+
+
+class ImportCommandTests(TemporaryExportDirMixin, TestCase):
+    def setUp(self):
+        super().setUp()
+        self.directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.directory)
+        self.json_dir = os.path.join(self.directory, 'json')
+        os.mkdir(self.json_dir)
+
+    def write_csv(self, rows, name='projects.csv'):
+        path = os.path.join(self.directory, name)
+        opener = gzip.open if name.endswith('.gz') else open
+        with opener(path, 'wt', encoding='utf-8', newline='') as f:
+            fieldnames = ['project_id', 'project_title', 'cihr_amounts', 'competition_year_month']
+            writer = csv.DictWriter(f, fieldnames=fieldnames)
+            writer.writeheader()
+            for project_id, title in rows.items():
+                writer.writerow({
+                    'project_id': project_id,
+                    'project_title': title,
+                    'cihr_amounts': '$2,500',
+                    'competition_year_month': '2022-09',
+                })
+        return path
+
+    def write_json(self, project_id, modified=None, **values):
+        path = os.path.join(self.json_dir, f'project_{project_id}.json')
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump({'broad_study_type': 'observational', **values}, f)
+        if modified:
+            os.utime(path, (modified, modified))
+
+    def import_cihr_data(self, csv_file, *args):
+        stdout = io.StringIO()
+        call_command(
+            'import_cihr_data', *args, json_dir=self.json_dir, csv_file=csv_file, stdout=stdout, stderr=io.StringIO()
+        )
+        return stdout.getvalue()
+
+    def import_csv_only(self, csv_file, *args):
+        stdout = io.StringIO()
+        call_command('import_csv_only', *args, csv_file=csv_file, stdout=stdout, stderr=io.StringIO())
+        return stdout.getvalue()
+
+    def test_manifest_skips_unchanged_inputs(self):
+        csv_file = self.write_csv({'2001': 'First', '2002': 'Second'})
+        self.write_json('2001', therapeutic_area='Oncology')
+        self.write_json('2002', therapeutic_area='Cardiology')
+
+        output = self.import_cihr_data(csv_file)
+        self.assertIn('Created: 2, Updated: 0', output)
+        self.assertEqual(CIHRProject.objects.get(project_id='2001').therapeutic_area, 'Oncology')
+
+        output = self.import_cihr_data(csv_file)
+        self.assertIn('Created: 0, Updated: 0, Unchanged: 2', output)
+        self.assertIn('skipped 2 unchanged inputs', output)
+
+        # An edited file is re-read even though the CSV row did not change
+        self.write_json('2001', modified=time.time() + 60, therapeutic_area='Neurology')
+        output = self.import_cihr_data(csv_file)
+        self.assertIn('Created: 0, Updated: 1, Unchanged: 1', output)
+        self.assertEqual(CIHRProject.objects.get(project_id='2001').therapeutic_area, 'Neurology')
+
+        output = self.import_cihr_data(csv_file, '--full')
+        self.assertIn('Updated: 0, Unchanged: 2', output)
+        self.assertIn('skipped 0 unchanged inputs', output)
+
+    def test_gzip_csv_streams_like_plain_csv(self):
+        rows = {'3001': 'First', '3002': 'Second, with a comma'}
+        plain = list(iter_csv_rows(self.write_csv(rows)))
+        compressed = list(iter_csv_rows(self.write_csv(rows, name='projects.csv.gz')))
+        self.assertEqual(compressed, plain)
+        self.assertEqual([project_id for project_id, _ in plain], ['3001', '3002'])
+
+        output = self.import_csv_only(os.path.join(self.directory, 'projects.csv.gz'))
+        self.assertIn('+ 2 projects created', output)
+        self.assertEqual(CIHRProject.objects.get(project_id='3002').project_title, 'Second, with a comma')
+
+    def test_csv_only_summary_diff(self):
+        csv_file = self.write_csv({'4001': 'First', '4002': 'Second'})
+        output = self.import_csv_only(csv_file)
+        self.assertIn('+ 2 projects created', output)
+
+        output = self.import_csv_only(csv_file)
+        self.assertIn('+ 0 projects created', output)
+        self.assertIn('- 2 existing projects skipped', output)
+
+        csv_file = self.write_csv({'4001': 'First', '4002': 'Second (revised)', '4003': 'Third'})
+        output = self.import_csv_only(csv_file, '--update-existing')
+        self.assertIn('+ 1 projects created', output)
+        self.assertIn('~ 1 projects updated', output)
+        self.assertIn('= 1 projects unchanged', output)
+        self.assertIn('- 0 existing projects skipped', output)
+
+
+class FlagStorageTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.project = CIHRProject.objects.create(
+            project_id='5001',
+            project_title='Flags',
+            patient_engagement='yes',
+            telemedicine='yes',
+            blockchain='N/A',
+            rare_disease='unclear',
+        )
+        CIHRProject.objects.create(project_id='5002', project_title='No flags', telemedicine='no')
+
+    def test_round_trip(self):
+        project = CIHRProject.objects.get(project_id='5001')
+        self.assertEqual(project.flags, FLAG_MASKS['patient_engagement'] | FLAG_MASKS['telemedicine'])
+        self.assertEqual(project.flag_exceptions, {'blockchain': 'N/A', 'rare_disease': 'unclear'})
+        self.assertEqual(
+            [
+                project.patient_engagement, project.telemedicine, project.blockchain, project.rare_disease,
+                project.digital_health,
+            ],
+            ['yes', 'yes', 'N/A', 'unclear', 'no'],
+        )
+
+        project.blockchain = 'yes'
+        project.telemedicine = 'no'
+        project.save()
+        project.refresh_from_db()
+        self.assertEqual(project.blockchain, 'yes')
+        self.assertEqual(project.telemedicine, 'no')
+        self.assertEqual(project.flag_exceptions, {'rare_disease': 'unclear'})
+
+    def test_hasbits_lookup(self):
+        flagged = CIHRProject.objects.filter(flag_q('telemedicine')).values_list('project_id', flat=True)
+        self.assertEqual(list(flagged), ['5001'])
+        mask = FLAG_MASKS['telemedicine'] | FLAG_MASKS['patient_engagement']
+        self.assertEqual(CIHRProject.objects.filter(flags__hasbits=mask).count(), 1)
+        mask |= FLAG_MASKS['digital_health']
+        self.assertFalse(CIHRProject.objects.filter(flags__hasbits=mask).exists())
+
+    def test_exceptions_are_not_yes_fields(self):
+        self.assertEqual(set(self.project.get_yes_fields().values()), {'yes'})
+        self.assertNotIn('Blockchain', self.project.get_yes_fields())
+
+
+class FlagMigrationTests(TransactionTestCase):
+    before = [('tracker', '0006_competition_year')]
+    after = [('tracker', '0007_flag_bitmask')]
+
+    def migrate(self, targets):
+        executor = MigrationExecutor(connection)
+        executor.loader.build_graph()
+        executor.migrate(targets)
+        return executor.loader.project_state(targets).apps
+
+    def tearDown(self):
+        executor = MigrationExecutor(connection)
+        executor.migrate(executor.loader.graph.leaf_nodes())
+
+    def test_pack_and_unpack(self):
+        apps = self.migrate(self.before)
+        apps.get_model('tracker', 'CIHRProject').objects.create(
+            project_id='6001', project_title='Flags', patient_engagement='yes', blockchain='N/A'
+        )
+
+        apps = self.migrate(self.after)
+        project = apps.get_model('tracker', 'CIHRProject').objects.get(project_id='6001')
+        self.assertEqual(project.flags, FLAG_MASKS['patient_engagement'])
+        self.assertEqual(project.flag_exceptions, {'blockchain': 'N/A'})
+
+        apps = self.migrate(self.before)
+        project = apps.get_model('tracker', 'CIHRProject').objects.get(project_id='6001')
+        self.assertEqual(
+            [project.patient_engagement, project.blockchain, project.telemedicine], ['yes', 'N/A', 'no']
+        )
+
+
+class CursorPaginationTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        CIHRProject.objects.bulk_create([
+            CIHRProject(project_id=str(7000 + i), project_title=f'Project {i}') for i in range(60)
+        ])
+
+    def get(self, url):
+        response = self.client.get(url, HTTP_ACCEPT='application/json')
+        self.assertEqual(response.status_code, 200)
+        return response.json()
+
+    def test_pages_are_stable_under_inserts(self):
+        first = self.get('/api/projects/?pagination=cursor')
+        self.assertNotIn('count', first)
+        self.assertEqual(len(first['results']), 50)
+
+        # A row inserted ahead of the cursor shifts offsets but not the next page
+        CIHRProject.objects.create(project_id='7999', project_title='Late arrival')
+        second = self.get(first['next'])
+        self.assertIsNone(second['next'])
+
+        seen = [row['project_id'] for row in first['results'] + second['results']]
+        self.assertEqual(seen, [str(7000 + i) for i in reversed(range(60))])
+
+    def test_page_numbers_by_default(self):
+        self.assertEqual(self.get('/api/projects/')['count'], 60)
+
+
+class CacheVersioningTests(TestCase):
+    def setUp(self):
+        bump_data_version()
+
+    def test_bump_retires_versioned_keys(self):
+        key = versioned_key('test_value', 'a')
+        self.assertEqual(get_or_compute(key, lambda: 'old'), 'old')
+        self.assertEqual(get_or_compute(key, lambda: 'ignored'), 'old')
+
+        version = data_version()
+        bump_data_version()
+        self.assertNotEqual(data_version(), version)
+        self.assertNotEqual(versioned_key('test_value', 'a'), key)
+        self.assertEqual(get_or_compute(versioned_key('test_value', 'a'), lambda: 'new'), 'new')
+
+    def test_waits_for_the_process_holding_the_lock(self):
+        key = versioned_key('test_single_flight')
+        cache.add(f'{key}:lock', 'other process')
+        calls = []
+
+        def other_process_stores():
+            cache.set(key, ('shared', math.inf, 0))
+
+        timer = threading.Timer(0.1, other_process_stores)
+        timer.start()
+        self.addCleanup(timer.join)
+        self.assertEqual(get_or_compute(key, lambda: calls.append(1) or 'duplicate'), 'shared')
+        self.assertEqual(calls, [])
+
+    def test_expired_entry_is_served_while_locked(self):
+        key = versioned_key('test_stale')
+        cache.set(key, ('stale', time.time() - 1, 0))
+        cache.add(f'{key}:lock', 'other process')
+        self.assertEqual(get_or_compute(key, lambda: 'fresh'), 'stale')
+
+        cache.delete(f'{key}:lock')
+        self.assertEqual(get_or_compute(key, lambda: 'fresh'), 'fresh')
+
+    def test_local_cache_evicts_least_recently_used(self):
+        local = LocalCache(2)
+        now = time.time()
+        local.set('a', (1, math.inf, 0))
+        local.set('b', (2, math.inf, 0))
+        local.get('a', now)
+        local.set('c', (3, math.inf, 0))
+        self.assertIsNone(local.get('b', now))
+        self.assertEqual(local.get('a', now)[0], 1)
+        self.assertEqual(local.get('c', now)[0], 3)
+        self.assertIsNone(local.get('d', now))
+        self.assertEqual(local.stats(), {'hits': 3, 'misses': 2, 'hit_ratio': 0.6, 'size': 2, 'max_entries': 2})
+
+        local.sync_version('another version')
+        self.assertEqual(local.stats()['size'], 0)
+
+
+class CacheStatsEndpointTests(TestCase):
+    @override_settings(DEBUG=False)
+    def test_staff_only(self):
+        self.assertEqual(self.client.get('/api/cache-stats/').status_code, 404)
+
+        self.client.force_login(User.objects.create_user('staff', is_staff=True))
+        response = self.client.get('/api/cache-stats/')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()['data_version'], data_version())
+        self.assertIn('hit_ratio', response.json()['local_cache'])
+        self.assertIn('private', response['Cache-Control'])
+
+
+class PivotTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        CIHRProject.objects.bulk_create([
+            CIHRProject(
+                project_id=str(8000 + i),
+                project_title=f'Project {i}',
+                broad_study_type=['interventional', 'observational', 'other'][i % 3],
+                competition_year=2020 + i % 2,
+                funding_amount=1000.0 * (i + 1),
+            )
+            for i in range(6)
+        ])
+
+    def setUp(self):
+        bump_data_version()
+
+    def test_query_validation(self):
+        for params, message in [
+            ({}, 'rows must be one of'),
+            ({'rows': 'broad_study_type', 'columns': 'broad_study_type'}, 'columns must be another of'),
+            ({'rows': 'broad_study_type', 'measure': 'median'}, 'measure must be one of'),
+            ({'rows': 'broad_study_type', 'measure': 'flag_share'}, 'flag_share needs'),
+            ({'rows': 'broad_study_type', 'limit': 'ten'}, 'limit must be an integer'),
+            ({'rows': 'broad_study_type', 'limit': str(MAX_ROWS + 1)}, 'limit must be between'),
+            ({'rows': 'broad_study_type', 'telemedicine': 'no'}, 'can only be filtered on yes'),
+        ]:
+            with self.subTest(params=params):
+                with self.assertRaisesMessage(PivotError, message):
+                    parse_pivot_query(params)
+
+    def test_rows_are_limited_largest_first(self):
+        response = self.client.get('/api/pivot/', {'rows': 'broad_study_type', 'measure': 'sum_funding', 'limit': 2})
+        self.assertEqual(response.status_code, 200)
+        data = response.json()
+        self.assertEqual((data['total_rows'], data['truncated']), (3, True))
+        self.assertEqual(data['row_values'], ['interventional', 'observational'])
+        self.assertEqual(data['values'], [5000, 7000])
+
+    def test_column_cap(self):
+        params = {'rows': 'broad_study_type', 'columns': 'competition_year'}
+        response = self.client.get('/api/pivot/', params)
+        self.assertEqual(response.json()['column_values'], [2020, 2021])
+
+        bump_data_version()
+        with mock.patch('tracker.pivot.MAX_COLUMNS', 1):
+            response = self.client.get('/api/pivot/', params)
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('max 1', response.json()['error'])
+
+
+class ExportTests(TemporaryExportDirMixin, TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        CIHRProject.objects.create(
+            project_id='9001', project_title='Cancer screening', competition_year_month='2023-09',
+            broad_study_type='interventional', telemedicine='yes', blockchain='N/A',
+        )
+        CIHRProject.objects.create(project_id='9002', project_title='Heart failure', competition_year_month='2021-03')
+
+    def test_filter_validation(self):
+        with self.assertRaisesMessage(ExportError, 'competition_year must be'):
+            export_filters({'competition_year': 'abc'})
+        with self.assertRaisesMessage(ExportError, 'can only be filtered on yes'):
+            export_filters({'telemedicine': 'no'})
+        self.assertEqual(
+            export_filters({'competition_year': '2023', 'telemedicine': 'YES', 'unknown': 'x'}),
+            {'competition_year': '2023', 'telemedicine': 'yes'},
+        )
+
+        response = self.client.get('/api/export/', {'competition_year': 'abc'})
+        self.assertEqual(response.status_code, 400)
+        response = self.client.get('/api/export/', {'format': 'xlsx'})
+        self.assertEqual(response.status_code, 400)
+
+    def test_csv(self):
+        data = b''.join(stream_export(export_queryset({}), 'csv', chunk_size=1)).decode('utf-8')
+        rows = list(csv.DictReader(io.StringIO(data)))
+        self.assertEqual([row['project_id'] for row in rows], ['9001', '9002'])
+        self.assertEqual(list(rows[0]), EXPORT_FIELDS)
+        self.assertEqual([rows[0]['telemedicine'], rows[0]['blockchain'], rows[1]['telemedicine']], ['yes', 'N/A', 'no'])
+
+    def test_ndjson_endpoint_filters(self):
+        response = self.client.get('/api/export/', {'format': 'ndjson', 'telemedicine': 'yes'})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response['Content-Type'], 'application/x-ndjson')
+        lines = b''.join(response.streaming_content).decode('utf-8').splitlines()
+        self.assertEqual(len(lines), 1)
+        row = json.loads(lines[0])
+        self.assertEqual((row['project_id'], row['competition_year'], row['telemedicine']), ('9001', 2023, 'yes'))
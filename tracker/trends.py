@@ -0,0 +1,183 @@
+"""Per-year rollups of project counts and funding, and the /api/trends/ series read from them"""
+import hashlib
+import json
+
+from django.db import transaction
+from django.db.models import Sum
+
+from .cache_utils import get_or_compute, versioned_key
+from .columnar import is_blank
+from .models import FLAG_FIELDS, FLAG_MASKS, CIHRProject, TrendRollup
+
+
+# Fields rolled up per value; 'all' holds the yearly totals and 'flag' one row per flag set to yes
+TREND_DIMENSIONS = ['broad_study_type', 'therapeutic_area', 'primary_institute', 'primary_theme']
+TOTAL_DIMENSION = 'all'
+FLAG_DIMENSION = 'flag'
+DIMENSIONS = [TOTAL_DIMENSION, *TREND_DIMENSIONS, FLAG_DIMENSION]
+
+# Project columns a rollup row depends on, in the order rollup_row() returns them
+ROLLUP_FIELDS = ['competition_year', 'funding_amount', *TREND_DIMENSIONS, 'flags']
+
+# Series returned when no values are requested, and the most that may be requested
+DEFAULT_SERIES_LIMIT = 10
+MAX_SERIES = 50
+
+
+class TrendError(ValueError):
+    """Invalid trends query; the message is returned to the client"""
+
+
+def rollup_row(project):
+    """Values of ROLLUP_FIELDS for a project instance"""
+    return tuple(getattr(project, field) for field in ROLLUP_FIELDS)
+
+
+def accumulate(totals, row, sign=1):
+    """Add (or with sign=-1 remove) one project's contribution to {(year, dimension, value): totals}"""
+    year, funding, *values, flags = row
+    if year is None:
+        return
+    keys = [(year, TOTAL_DIMENSION, '')]
+    keys += [(year, dimension, value) for dimension, value in zip(TREND_DIMENSIONS, values) if not is_blank(value)]
+    keys += [(year, FLAG_DIMENSION, name) for name in FLAG_FIELDS if (flags or 0) & FLAG_MASKS[name]]
+    funded = funding is not None and funding > 0
+    for key in keys:
+        entry = totals.setdefault(key, [0, 0, 0.0])
+        entry[0] += sign
+        entry[1] += sign if funded else 0
+        entry[2] += sign * funding if funded else 0.0
+
+
+def apply_deltas(deltas):
+    """Add accumulated deltas to the rollup table, dropping rows whose count reaches zero.
+
+    Must run inside the transaction that writes the projects, so the rollup
+    never disagrees with the table.
+    """
+    deltas = {key: delta for key, delta in deltas.items() if delta[0] or delta[1] or delta[2]}
+    if not deltas:
+        return
+
+    existing = {
+        (row.year, row.dimension, row.value): row
+        for row in TrendRollup.objects.filter(
+            year__in={key[0] for key in deltas},
+            dimension__in={key[1] for key in deltas},
+            value__in={key[2] for key in deltas},
+        )
+    }
+    to_create = []
+    to_update = []
+    to_delete = []
+    for (year, dimension, value), (count, funded, funding) in deltas.items():
+        row = existing.get((year, dimension, value))
+        if row is None:
+            if count > 0:
+                to_create.append(TrendRollup(
+                    year=year, dimension=dimension, value=value,
+                    project_count=count, funded_count=funded, funding_total=funding,
+                ))
+            continue
+        row.project_count += count
+        row.funded_count += funded
+        row.funding_total += funding
+        if row.project_count > 0:
+            to_update.append(row)
+        else:
+            to_delete.append(row.pk)
+
+    if to_create:
+        TrendRollup.objects.bulk_create(to_create)
+    if to_update:
+        TrendRollup.objects.bulk_update(to_update, ['project_count', 'funded_count', 'funding_total'])
+    if to_delete:
+        TrendRollup.objects.filter(pk__in=to_delete).delete()
+
+
+def rebuild_trends():
+    """Recompute the whole rollup table from the project table; returns the number of rows"""
+    totals = {}
+    for row in CIHRProject.objects.order_by().values_list(*ROLLUP_FIELDS).iterator(chunk_size=2000):
+        accumulate(totals, row)
+    with transaction.atomic():
+        TrendRollup.objects.all().delete()
+        TrendRollup.objects.bulk_create(
+            [
+                TrendRollup(
+                    year=year, dimension=dimension, value=value,
+                    project_count=count, funded_count=funded, funding_total=funding,
+                )
+                for (year, dimension, value), (count, funded, funding) in totals.items()
+            ],
+            batch_size=2000,
+        )
+    return len(totals)
+
+
+def parse_trend_query(params):
+    """Normalized trends query from request parameters, raising TrendError when invalid"""
+    dimension = params.get('dimension') or TOTAL_DIMENSION
+    if dimension not in DIMENSIONS:
+        raise TrendError(f'dimension must be one of: {", ".join(DIMENSIONS)}')
+
+    values = [value for value in params.getlist('value') if value] if dimension != TOTAL_DIMENSION else ['']
+    if len(values) > MAX_SERIES:
+        raise TrendError(f'at most {MAX_SERIES} values can be requested')
+
+    try:
+        limit = int(params.get('limit') or DEFAULT_SERIES_LIMIT)
+        start = int(params['from']) if params.get('from') else None
+        end = int(params['to']) if params.get('to') else None
+    except ValueError:
+        raise TrendError('limit, from and to must be integers')
+    if not 1 <= limit <= MAX_SERIES:
+        raise TrendError(f'limit must be between 1 and {MAX_SERIES}')
+
+    return {'dimension': dimension, 'values': values, 'limit': limit, 'from': start, 'to': end}
+
+
+def trends_cache_key(query):
+    digest = hashlib.sha256(json.dumps(query, sort_keys=True).encode('utf-8')).hexdigest()
+    return versioned_key('trends', digest)
+
+
+def run_trends(query):
+    """Trend payload for a parsed query, cached per normalized query until the next import"""
+    return get_or_compute(trends_cache_key(query), lambda: trend_series(query))
+
+
+def trend_series(query):
+    """Yearly points per value of a dimension, read from the rollup table.
+
+    Without explicit values the series with the most projects over the
+    requested years are returned, largest first.
+    """
+    rows = TrendRollup.objects.filter(dimension=query['dimension'])
+    if query['from'] is not None:
+        rows = rows.filter(year__gte=query['from'])
+    if query['to'] is not None:
+        rows = rows.filter(year__lte=query['to'])
+
+    values = query['values']
+    if not values:
+        ranked = rows.values('value').annotate(total=Sum('project_count')).order_by('-total', 'value')
+        values = [row['value'] for row in ranked[:query['limit']]]
+
+    points = {value: [] for value in values}
+    for value, year, count, funded, funding in rows.filter(value__in=values).order_by('value', 'year').values_list(
+        'value', 'year', 'project_count', 'funded_count', 'funding_total'
+    ):
+        points[value].append({
+            'year': year,
+            'project_count': count,
+            'funded_count': funded,
+            'funding_total': funding,
+        })
+
+    return {
+        'dimension': query['dimension'],
+        'from': query['from'],
+        'to': query['to'],
+        'series': [{'value': value, 'points': points[value]} for value in values],
+    }
@@ -0,0 +1,199 @@
+"""In-process prefix index serving search suggestions for api_project_search"""
+import heapq
+import re
+import threading
+import time
+from bisect import bisect_left
+from collections import OrderedDict
+
+from django.urls import reverse
+
+from .cache_utils import data_version
+from .models import CIHRProject
+
+
+# Rebuild at least this often even if no import was signalled (e.g. per-process caches)
+INDEX_MAX_AGE = 60 * 15
+
+# Number of recent queries whose suggestions are kept per process
+HOT_QUERY_LIMIT = 1024
+
+SUGGESTION_LIMIT = 10
+
+TOKEN_RE = re.compile(r'\w+')
+
+
+def tokenize(text):
+    return TOKEN_RE.findall((text or '').lower())
+
+
+class TypeaheadIndex:
+    """Sorted word list with ascending posting lists over titles and investigators.
+
+    Projects are numbered in '-project_id' order, so a lower number wins ties.
+    A query matches projects where every query word is a prefix of a word in
+    the title or the investigators. Titles starting with the whole query rank
+    first, then other title matches, then investigator matches. Posting lists
+    are merged lazily, so each walk stops as soon as it has enough results.
+    """
+
+    def __init__(self, rows):
+        self.projects = []
+        self.title_words = []
+        self.all_words = []
+        title_postings = {}
+        all_postings = {}
+        titles = []
+
+        for number, project in enumerate(rows):
+            _, title, investigators = project
+            self.projects.append(project)
+            title_tokens = tokenize(title)
+            title_words = frozenset(title_tokens)
+            all_words = title_words | frozenset(tokenize(investigators))
+            self.title_words.append(title_words)
+            self.all_words.append(all_words)
+            titles.append((' '.join(title_tokens), number))
+            for token in title_words:
+                title_postings.setdefault(token, []).append(number)
+            for token in all_words:
+                all_postings.setdefault(token, []).append(number)
+
+        self.tokens = sorted(all_postings)
+        self.title_postings = [title_postings.get(token, []) for token in self.tokens]
+        self.all_postings = [all_postings[token] for token in self.tokens]
+        titles.sort()
+        self.title_keys = [key for key, _ in titles]
+        self.title_numbers = [number for _, number in titles]
+
+    @classmethod
+    def from_database(cls):
+        rows = CIHRProject.objects.order_by('-project_id').values_list(
+            'project_id', 'project_title', 'principal_investigators'
+        )
+        return cls(rows.iterator(chunk_size=2000))
+
+    @staticmethod
+    def _prefix_range(keys, prefix):
+        start = bisect_left(keys, prefix)
+        return start, bisect_left(keys, prefix + '\U0010ffff', start)
+
+    @staticmethod
+    def _walk(postings, accept, skip, limit):
+        """Up to limit accepted numbers from the merged postings, in rank order"""
+        hits = []
+        previous = None
+        for number in heapq.merge(*postings):
+            if number == previous or number in skip:
+                continue
+            previous = number
+            if accept(number):
+                hits.append(number)
+                if len(hits) >= limit:
+                    break
+        return hits
+
+    def search(self, query, limit=SUGGESTION_LIMIT):
+        terms = tokenize(query)
+        if not terms:
+            return []
+
+        def matches(words):
+            return all(any(word.startswith(term) for word in words) for term in terms)
+
+        # Titles that start with the whole query
+        start, end = self._prefix_range(self.title_keys, ' '.join(terms))
+        ranked = heapq.nsmallest(limit, self.title_numbers[start:end])
+
+        # Walk the postings of the most selective term: title matches, then the rest
+        if len(ranked) < limit:
+            ranges = [self._prefix_range(self.tokens, term) for term in terms]
+            start, end = min(
+                ranges, key=lambda r: sum(len(postings) for postings in self.all_postings[r[0]:r[1]])
+            )
+            skip = set(ranked)
+            ranked += self._walk(
+                self.title_postings[start:end],
+                lambda number: matches(self.title_words[number]),
+                skip,
+                limit - len(ranked),
+            )
+
+        if len(ranked) < limit:
+            skip = set(ranked)
+            ranked += self._walk(
+                self.all_postings[start:end],
+                lambda number: matches(self.all_words[number]),
+                skip,
+                limit - len(ranked),
+            )
+
+        return [self.suggestion(number) for number in ranked]
+
+    def suggestion(self, number):
+        project_id, title, investigators = self.projects[number]
+        return {
+            'id': project_id,
+            'title': title,
+            'pi': investigators,
+            'url': reverse('tracker:project_detail', kwargs={'project_id': project_id}),
+        }
+
+
+class TypeaheadEngine:
+    """Per-process TypeaheadIndex plus an LRU of hot queries, rebuilt when the data version is bumped"""
+
+    def __init__(self):
+        self.build_lock = threading.Lock()
+        self.hot_lock = threading.Lock()
+        self.index = None
+        self.version = None
+        self.built_at = 0
+        self.hot = OrderedDict()
+
+    def is_stale(self, version):
+        return (
+            self.index is None
+            or version != self.version
+            or time.monotonic() - self.built_at > INDEX_MAX_AGE
+        )
+
+    def current_index(self):
+        version = data_version()
+        if self.is_stale(version):
+            with self.build_lock:
+                if self.is_stale(version):
+                    index = TypeaheadIndex.from_database()
+                    with self.hot_lock:
+                        self.index = index
+                        self.version = version
+                        self.built_at = time.monotonic()
+                        self.hot = OrderedDict()
+        return self.index
+
+    def suggest(self, query):
+        index = self.current_index()
+        key = ' '.join(tokenize(query))
+
+        with self.hot_lock:
+            hot = self.hot
+            results = hot.get(key)
+            if results is not None:
+                hot.move_to_end(key)
+                return results
+
+        results = index.search(key)
+        with self.hot_lock:
+            hot[key] = results
+            if len(hot) > HOT_QUERY_LIMIT:
+                hot.popitem(last=False)
+        return results
+
+
+engine = TypeaheadEngine()
+
+
+def suggest(query):
+    """Top ranked {id, title, pi, url} suggestions for a partially typed query"""
+    return engine.suggest(query)
+
@@ -19,6 +19,10 @@ urlpatterns = [
     
     # AJAX endpoints
     path('api/search/', views.api_project_search, name='api_search'),
+    path('api/pivot/', views.api_pivot, name='api_pivot'),
+    path('api/trends/', views.api_trends, name='api_trends'),
+    path('api/export/', views.api_export, name='api_export'),
+    path('api/cache-stats/', views.api_cache_stats, name='api_cache_stats'),
     
     # REST API
     path('api/', include(router.urls)),
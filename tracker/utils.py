@@ -0,0 +1,13 @@
+"""Small helpers shared by the importers and exports"""
+
+
+def chunked(iterable, size):
+    """Yield lists of at most size items from iterable"""
+    chunk = []
+    for item in iterable:
+        chunk.append(item)
+        if len(chunk) >= size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk